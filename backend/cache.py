@@ -0,0 +1,225 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend import models, serialization
+
+DATA_VERSION_TTL = float(os.getenv("API_DATA_VERSION_TTL", 5))
+TOTALS_MAX_ENTRIES = int(os.getenv("API_TOTALS_MAX_ENTRIES", 1024))
+RESPONSE_CACHE_BYTES = int(os.getenv("API_RESPONSE_CACHE_BYTES", 32 * 1024 * 1024))
+
+_lock = threading.Lock()
+_version = {"value": None, "checked_at": 0.0, "enabled": True}
+_totals = {}
+
+
+def set_versioned(enabled: bool) -> None:
+    """
+    Liga ou desliga a leitura da tabela versao_dados. Sem ela (migração 002
+    não aplicada), a versão dos dados fica fixa em 0.
+    """
+    with _lock:
+        _version.update(enabled=enabled, value=None, checked_at=0.0)
+
+
+def get_data_version(db: Session) -> int:
+    """
+    Retorna a versão atual dos dados, incrementada pelo importador a cada carga.
+    O valor é relido do banco no máximo uma vez a cada DATA_VERSION_TTL segundos.
+    """
+    if not _version["enabled"]:
+        return 0
+
+    now = time.monotonic()
+    if _version["value"] is not None and now - _version["checked_at"] < DATA_VERSION_TTL:
+        return _version["value"]
+
+    value = db.query(models.VersaoDados.versao).filter(models.VersaoDados.id == 1).scalar() or 0
+
+    with _lock:
+        _version["value"] = value
+        _version["checked_at"] = now
+    return value
+
+
+def cached_total(db: Session, key, query) -> int:
+    """
+    Retorna `query.count()` reaproveitando o resultado enquanto a versão dos
+    dados não mudar. A chave deve identificar os filtros da consulta.
+    """
+    cache_key = (key, get_data_version(db))
+
+    with _lock:
+        if cache_key in _totals:
+            return _totals[cache_key]
+
+    total = query.count()
+
+    with _lock:
+        if len(_totals) >= TOTALS_MAX_ENTRIES:
+            _totals.pop(next(iter(_totals)))
+        _totals[cache_key] = total
+    return total
+
+
+CachedResponse = namedtuple("CachedResponse", ["body", "etag"])
+
+
+class ResponseCache:
+    """
+    Cache LRU de respostas JSON já serializadas, limitado por memória.
+
+    Falhas simultâneas na mesma chave são agrupadas: só a primeira
+    requisição executa a consulta e as demais esperam o resultado dela,
+    evitando que todas batam no banco logo após uma nova carga.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._inflight_async = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute) -> CachedResponse:
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry
+
+                flight = self._inflight.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._inflight[key] = {"done": threading.Event(), "entry": None}
+                    self.misses += 1
+
+            if not leader:
+                flight["done"].wait()
+                if flight["entry"] is not None:
+                    return flight["entry"]
+                continue  # a consulta da primeira requisição falhou: tenta de novo
+
+            try:
+                flight["entry"] = compute()
+                self._store(key, flight["entry"])
+                return flight["entry"]
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                flight["done"].set()
+
+    async def get_or_compute_async(self, key, compute) -> CachedResponse:
+        """Versão de `get_or_compute` para o modo async: `compute` é uma corrotina."""
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry
+
+                flight = self._inflight_async.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._inflight_async[key] = asyncio.get_running_loop().create_future()
+                    self.misses += 1
+
+            if not leader:
+                entry = await asyncio.shield(flight)
+                if entry is not None:
+                    return entry
+                continue
+
+            entry = None
+            try:
+                entry = await compute()
+                self._store(key, entry)
+                return entry
+            finally:
+                with self._lock:
+                    self._inflight_async.pop(key, None)
+                flight.set_result(entry)
+
+    def _store(self, key, entry: CachedResponse):
+        cost = len(entry.body) + len(entry.etag)
+        if cost > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = entry
+            self.size += cost
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted.body) + len(evicted.etag)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+responses = ResponseCache(RESPONSE_CACHE_BYTES)
+
+
+def _serialize(content, model=None) -> CachedResponse:
+    """JSON da resposta, validado pelo `model` da rota quando informado."""
+    body = serialization.dumps(content) if model is None else serialization.dumps_validated(model, content)
+    return CachedResponse(body, f'W/"{hashlib.sha1(body).hexdigest()[:16]}"')
+
+
+def warm(db: Session, key, build, model=None):
+    """Carrega no cache a resposta de `build(db)`, com a mesma chave e o mesmo modelo da rota."""
+    responses.get_or_compute((key, get_data_version(db)), lambda: _serialize(build(db), model))
+
+
+def cached_response(request: Request, db: Session, key, build, model=None) -> Response:
+    """
+    Responde com o JSON de `build()` guardado em cache até a próxima carga.
+
+    A chave deve identificar a rota e os parâmetros; a versão dos dados é
+    acrescentada aqui. O corpo é validado com `model` (o `response_model`
+    da rota) antes de entrar no cache. Requisições com `If-None-Match`
+    igual ao ETag recebem 304 sem corpo.
+    """
+    entry = responses.get_or_compute((key, get_data_version(db)), lambda: _serialize(build(), model))
+    return _to_response(request, entry)
+
+
+async def respond(request: Request, db, key, build, model=None) -> Response:
+    """
+    Ponto de entrada das rotas (sempre `async def`): `build(db)` recebe uma
+    sessão síncrona. No modo sync a consulta roda no threadpool, como antes;
+    no modo async ela roda sobre a conexão asyncpg via `AsyncSession.run_sync`.
+    """
+    if not isinstance(db, AsyncSession):
+        return await run_in_threadpool(cached_response, request, db, key, lambda: build(db), model)
+
+    version = await db.run_sync(get_data_version)
+    entry = await responses.get_or_compute_async(
+        (key, version), lambda: db.run_sync(lambda session: _serialize(build(session), model))
+    )
+    return _to_response(request, entry)
+
+
+def _to_response(request: Request, entry: CachedResponse) -> Response:
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+
+    if request.headers.get("if-none-match") == entry.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
@@ -0,0 +1,154 @@
+"""
+Exportação em fluxo das tabelas carregadas (CSV ou NDJSON, com gzip opcional).
+
+As linhas são lidas com cursor no servidor (`yield_per`), em lotes de
+API_EXPORT_BATCH_ROWS, e cada lote é convertido e enviado antes do
+próximo ser lido. Assim a memória da API não cresce com o tamanho da exportação.
+"""
+
+import csv
+import io
+import os
+import zlib
+from decimal import Decimal
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
+
+from backend import database, models, serialization
+
+EXPORT_BATCH_ROWS = int(os.getenv("API_EXPORT_BATCH_ROWS", 5000))
+
+DATASETS = ("operadoras", "demonstracoes_contabeis", "despesas_agregadas")
+FORMATS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def build_query(dataset, uf=None, modalidade=None, ano_inicio=None, trimestre_inicio=1, ano_fim=None, trimestre_fim=4):
+    """
+    Monta a consulta da tabela com os filtros pedidos.
+    UF e modalidade valem para todas as tabelas; o período, só para `demonstracoes_contabeis`.
+    """
+    if dataset not in DATASETS:
+        raise HTTPException(status_code=404, detail="Tabela não disponível para exportação")
+
+    operadora = models.Operadora
+    has_period = ano_inicio is not None or ano_fim is not None
+
+    if dataset == "operadoras":
+        stmt = select(
+            operadora.registro_ans, operadora.cnpj, operadora.razao_social, operadora.modalidade, operadora.uf
+        ).order_by(operadora.registro_ans)
+        uf_column = operadora.uf
+
+    elif dataset == "demonstracoes_contabeis":
+        despesa = models.DemonstracaoContabil
+        stmt = select(
+            despesa.registro_ans, despesa.ano, despesa.trimestre, despesa.valor_despesa
+        ).order_by(despesa.registro_ans, despesa.ano, despesa.trimestre)
+        if uf or modalidade:
+            stmt = stmt.join(operadora, operadora.registro_ans == despesa.registro_ans)
+        uf_column = operadora.uf
+
+        period = tuple_(despesa.ano, despesa.trimestre)
+        if ano_inicio is not None:
+            stmt = stmt.where(period >= tuple_(ano_inicio, trimestre_inicio))
+        if ano_fim is not None:
+            stmt = stmt.where(period <= tuple_(ano_fim, trimestre_fim))
+
+    else:
+        agregado = models.DespesasAgregadas
+        stmt = select(
+            agregado.registro_ans, agregado.razao_social, agregado.uf,
+            agregado.total_despesas, agregado.media_trimestral, agregado.desvio_padrao,
+        ).order_by(agregado.registro_ans)
+        if modalidade:
+            stmt = stmt.join(operadora, operadora.registro_ans == agregado.registro_ans)
+        uf_column = agregado.uf
+
+    if has_period and dataset != "demonstracoes_contabeis":
+        raise HTTPException(status_code=400, detail="Filtro de período disponível apenas para demonstracoes_contabeis")
+
+    if uf:
+        stmt = stmt.where(uf_column == uf.upper())
+    if modalidade:
+        stmt = stmt.where(operadora.modalidade == modalidade)
+
+    return stmt.execution_options(yield_per=EXPORT_BATCH_ROWS)
+
+
+class StreamEncoder:
+    """Converte lotes de linhas em bytes no formato pedido, comprimindo se necessário."""
+
+    def __init__(self, columns, formato, compress):
+        self.columns = list(columns)
+        self.formato = formato
+        self._gzip = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def _output(self, text):
+        data = text.encode("utf-8")
+        return self._gzip.compress(data) if self._gzip else data
+
+    def start(self):
+        if self.formato != "csv":
+            return b""
+        return self._output(";".join(self.columns) + "\n")
+
+    def encode(self, rows):
+        buffer = io.StringIO()
+        if self.formato == "csv":
+            writer = csv.writer(buffer, delimiter=";", lineterminator="\n")
+            writer.writerows([_csv_value(v) for v in row] for row in rows)
+        else:
+            for row in rows:
+                buffer.write(serialization.dumps(dict(zip(self.columns, row))).decode("utf-8"))
+                buffer.write("\n")
+        return self._output(buffer.getvalue())
+
+    def finish(self):
+        return self._gzip.flush() if self._gzip else b""
+
+
+def _csv_value(value):
+    """Mesmo padrão dos CSVs do pipeline: vírgula decimal e vazio para nulos."""
+    if value is None:
+        return ""
+    if isinstance(value, (Decimal, float)):
+        return str(value).replace(".", ",")
+    return value
+
+
+def _stream_sync(stmt, encoder):
+    db = database.SessionLocal()
+    try:
+        yield encoder.start()
+        for rows in db.execute(stmt).partitions():
+            yield encoder.encode(rows)
+        yield encoder.finish()
+    finally:
+        db.close()
+
+
+async def _stream_async(stmt, encoder):
+    async with database.AsyncSessionLocal() as db:
+        yield encoder.start()
+        result = await db.stream(stmt)
+        async for rows in result.partitions():
+            yield encoder.encode(rows)
+        yield encoder.finish()
+
+
+def streaming_response(dataset, stmt, formato="csv", compress=False):
+    """
+    Resposta em fluxo com a exportação. A sessão é aberta pelo próprio
+    gerador, para continuar válida enquanto o corpo é enviado.
+    """
+    encoder = StreamEncoder(stmt.selected_columns.keys(), formato, compress)
+    stream = _stream_async(stmt, encoder) if database.DB_MODE == "async" else _stream_sync(stmt, encoder)
+
+    filename = f"{dataset}.{formato}" + (".gz" if compress else "")
+    media_type = "application/gzip" if compress else FORMATS[formato]
+    return StreamingResponse(
+        stream, media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,101 @@
+"""
+Inicialização da API fora do caminho de importação.
+
+O lifespan do FastAPI dispara `prepare_until_ready` em segundo plano: o
+servidor começa a aceitar conexões na hora (liveness em `/`), e só passa
+a responder "pronto" em `/ready` depois que o banco responde, as tabelas
+existem e os caches de aquecimento foram carregados. Sem a tabela
+versao_dados (migração 002), a API sobe com a versão dos dados fixa em 0
+e registra no log a migração a aplicar. Se o banco estiver
+fora do ar, a verificação é repetida a cada API_STARTUP_RETRY segundos.
+"""
+
+import asyncio
+import logging
+import os
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from backend import cache, database, models
+
+# Cria as tabelas que faltarem (create_all) ao iniciar; para desenvolvimento local
+CREATE_SCHEMA = os.getenv("API_CREATE_SCHEMA", "0") == "1"
+# Pré-carrega no cache as respostas mais acessadas antes de declarar a API pronta
+WARMUP = os.getenv("API_WARMUP", "1") == "1"
+STARTUP_RETRY = float(os.getenv("API_STARTUP_RETRY", 5))
+
+REQUIRED_TABLES = ("operadoras", "demonstracoes_contabeis", "despesas_agregadas")
+# Opcional: sem ela, a versão dos dados fica em 0 e novas cargas não invalidam os caches
+VERSION_TABLE = "versao_dados"
+
+logger = logging.getLogger("uvicorn.error")
+
+state = {"ready": False, "detail": "inicializando"}
+
+
+def missing_tables(existing):
+    """Tabelas obrigatórias ausentes no banco (sql/create_tables.sql)."""
+    return [table for table in REQUIRED_TABLES if table not in existing]
+
+
+def prepare(warmups):
+    """
+    Verifica o schema e aquece o cache. Retorna True quando a API está pronta.
+    `warmups` é uma lista de (chave do cache, função que recebe a sessão,
+    modelo da resposta).
+    """
+    if CREATE_SCHEMA:
+        models.Base.metadata.create_all(bind=database.engine)
+
+    existing = set(inspect(database.engine).get_table_names())
+    missing = missing_tables(existing)
+    if missing:
+        state["detail"] = "tabelas ausentes: " + ", ".join(missing)
+        return False
+
+    versioned = VERSION_TABLE in existing
+    cache.set_versioned(versioned)
+    if not versioned:
+        logger.error(
+            "Tabela %s ausente: rode sql/migrations/002_versao_dados.sql e reinicie a API. "
+            "Até lá a versão dos dados fica em 0 e novas cargas não invalidam os caches.",
+            VERSION_TABLE,
+        )
+
+    if WARMUP:
+        db = database.SessionLocal()
+        try:
+            for key, build, model in warmups:
+                cache.warm(db, key, build, model)
+        finally:
+            db.close()
+
+    state.update(ready=True, detail="pronto" if versioned else f"pronto, sem a tabela {VERSION_TABLE} (migração 002)")
+    return True
+
+
+async def prepare_until_ready(warmups):
+    while True:
+        try:
+            if await run_in_threadpool(prepare, warmups):
+                logger.info("API pronta para receber requisições")
+                return
+        except SQLAlchemyError as exc:
+            state["detail"] = f"banco indisponível: {exc.__class__.__name__}"
+
+        logger.warning("API ainda não está pronta (%s); nova tentativa em %.0fs", state["detail"], STARTUP_RETRY)
+        await asyncio.sleep(STARTUP_RETRY)
+
+
+def ping():
+    """Confirma que o banco continua respondendo."""
+    with database.engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+async def shutdown():
+    database.engine.dispose()
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
@@ -1,16 +1,33 @@
-from fastapi import FastAPI, Depends, HTTPException
+import asyncio
+from contextlib import asynccontextmanager
+from typing import List
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, or_, func
-from backend.database import get_db, engine
-from backend import models
+from sqlalchemy import and_, desc, func, tuple_
+from backend.database import get_session
+from backend import database, models, cache, exports, lifecycle, metrics, schemas, search as operator_search
+from backend.pagination import encode_cursor, decode_cursor
 
-models.Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Schema e aquecimento do cache rodam em segundo plano depois que o
+    servidor sobe; o import do módulo não abre conexão com o banco.
+    """
+    startup = asyncio.create_task(lifecycle.prepare_until_ready(WARMUP_RESPONSES))
+    yield
+    startup.cancel()
+    await lifecycle.shutdown()
 
 app = FastAPI(
     title="API Intuitive Care",
     description="API para consulta de despesas de operadoras de saúde",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 origins = [
@@ -26,57 +43,213 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.get("/api/operadoras")
-def list_operators(
-    page: int = 1,
-    limit: int = 10,
+if metrics.ENABLED:
+    metrics.instrument_engine(database.engine, "sync")
+    if database.async_engine is not None:
+        metrics.instrument_engine(database.async_engine.sync_engine, "async")
+    app.add_middleware(metrics.MetricsMiddleware, routes=app.routes)
+
+@app.get("/api/operadoras", response_model=schemas.OperadorasPagina)
+async def list_operators(
+    request: Request,
+    page: int = Query(1, ge=1),
+    limit: int = Query(10, ge=1),
     search: str = None,
-    db: Session = Depends(get_db)
+    cursor: str = None,
+    db: Session = Depends(get_session)
 ):
-    skip = (page - 1) * limit
-    query = db.query(models.Operadora)
+    """
+    Lista operadoras ordenadas por registro ANS ou, quando há busca,
+    por relevância (prefixo de CNPJ, início da razão social, similaridade).
+
+    Aceita paginação por `page` (offset) ou por `cursor`, o token `next`
+    devolvido na página anterior, que evita percorrer os registros pulados.
+    O total é reaproveitado enquanto a versão dos dados não mudar.
+    """
+    return await cache.respond(
+        request, db, ("operadoras", page, limit, search or "", cursor or ""),
+        lambda db: _list_operators(db, page, limit, search, cursor),
+        model=schemas.OperadorasPagina,
+    )
+
+def _list_operators(db: Session, page: int, limit: int, search: str, cursor: str):
+    query = db.query(*schemas.columns(models.Operadora, schemas.Operadora))
+    score = None
 
     if search:
-        query = query.filter(
-            or_(
-                models.Operadora.razao_social.ilike(f"%{search}%"),
-                models.Operadora.cnpj.ilike(f"%{search}%")
-            )
-        )
+        query, score = operator_search.apply_search(db, query, search)
+
+    total = cache.cached_total(db, ("operadoras", search or ""), query)
+
+    if score is None:
+        page_query = query.order_by(models.Operadora.registro_ans)
+    else:
+        page_query = query.add_columns(score.label("score")).order_by(desc("score"), models.Operadora.registro_ans)
 
-    total = query.count()
-    operators = query.offset(skip).limit(limit).all()
+    if cursor:
+        after, after_score = decode_cursor(cursor)
+        if score is None:
+            page_query = page_query.filter(models.Operadora.registro_ans > after)
+        elif after_score is not None:
+            page_query = page_query.filter(operator_search.after_cursor(score, after_score, after))
+        else:
+            raise HTTPException(status_code=400, detail="Cursor de paginação inválido")
+    else:
+        page_query = page_query.offset((page - 1) * limit)
+
+    rows = page_query.limit(limit + 1).all()
+    fields = schemas.Operadora.model_fields
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last.registro_ans, None if score is None else last.score)
 
     return {
-        "data": operators,
+        "data": [{name: getattr(row, name) for name in fields} for row in rows[:limit]],
         "total": total,
         "page": page,
-        "limit": limit
+        "limit": limit,
+        "next": next_cursor
     }
 
-@app.get("/api/operadoras/{cnpj}")
-def get_operator_details(cnpj: str, db: Session = Depends(get_db)):
-    operator = db.query(models.Operadora).filter(models.Operadora.cnpj == cnpj).first()
+def _operator_key(db: Session, cnpj: str):
+    """Subconsulta com o registro ANS da operadora do CNPJ (o menor, se houver mais de um)."""
+    return (
+        db.query(models.Operadora.registro_ans)
+        .filter(models.Operadora.cnpj == cnpj)
+        .order_by(models.Operadora.registro_ans)
+        .limit(1)
+        .scalar_subquery()
+    )
+
+@app.get("/api/operadoras/{cnpj}", response_model=schemas.Operadora)
+async def get_operator_details(cnpj: str, request: Request, db: Session = Depends(get_session)):
+    def build(db):
+        operator = (
+            db.query(*schemas.columns(models.Operadora, schemas.Operadora))
+            .filter(models.Operadora.cnpj == cnpj)
+            .first()
+        )
+
+        if not operator:
+            raise HTTPException(status_code=404, detail="Operadora não encontrada")
+        return operator._asdict()
 
-    if not operator:
+    return await cache.respond(request, db, ("operadora", cnpj), build, model=schemas.Operadora)
+
+@app.get("/api/operadoras/{cnpj}/despesas", response_model=List[schemas.Despesa])
+async def get_operator_expenses(
+    cnpj: str,
+    request: Request,
+    ano_inicio: int = Query(None, ge=1900),
+    trimestre_inicio: int = Query(1, ge=1, le=4),
+    ano_fim: int = Query(None, ge=1900),
+    trimestre_fim: int = Query(4, ge=1, le=4),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_session)
+):
+    """
+    Histórico de despesas da operadora, ordenado por período. Com mais
+    trimestres que `limit`, ficam os mais recentes.
+
+    Uma única consulta: a operadora é localizada pelo CNPJ e as despesas vêm
+    por LEFT JOIN, filtradas pelo índice (registro_ans, ano, trimestre).
+    Nenhuma linha significa operadora inexistente; uma linha sem período,
+    operadora sem despesas no intervalo.
+    """
+    return await cache.respond(
+        request, db, ("despesas", cnpj, ano_inicio, trimestre_inicio, ano_fim, trimestre_fim, limit),
+        lambda db: _operator_expenses(db, cnpj, ano_inicio, trimestre_inicio, ano_fim, trimestre_fim, limit),
+        model=List[schemas.Despesa],
+    )
+
+def _operator_expenses(db: Session, cnpj: str, ano_inicio, trimestre_inicio, ano_fim, trimestre_fim, limit):
+    despesa = models.DemonstracaoContabil
+    period = tuple_(despesa.ano, despesa.trimestre)
+
+    join_on = [despesa.registro_ans == models.Operadora.registro_ans]
+    if ano_inicio is not None:
+        join_on.append(period >= tuple_(ano_inicio, trimestre_inicio))
+    if ano_fim is not None:
+        join_on.append(period <= tuple_(ano_fim, trimestre_fim))
+
+    rows = (
+        db.query(despesa.ano, despesa.trimestre, despesa.valor_despesa)
+        .select_from(models.Operadora)
+        .outerjoin(despesa, and_(*join_on))
+        .filter(models.Operadora.registro_ans == _operator_key(db, cnpj))
+        .order_by(despesa.ano.desc(), despesa.trimestre.desc())
+        .limit(limit)
+        .all()
+    )
+
+    if not rows:
         raise HTTPException(status_code=404, detail="Operadora não encontrada")
-    return operator
+    # O limite corta os períodos mais antigos; a resposta volta à ordem crescente
+    return [row._asdict() for row in reversed(rows) if row.ano is not None]
+
+@app.get("/api/operadoras/{cnpj}/perfil", response_model=schemas.PerfilOperadora)
+async def get_operator_profile(cnpj: str, request: Request, db: Session = Depends(get_session)):
+    """
+    Dados cadastrais, série trimestral e estatísticas agregadas da operadora.
 
-@app.get("/api/operadoras/{cnpj}/despesas")
-def get_operator_expenses(cnpj: str, db: Session = Depends(get_db)):
-    operator = db.query(models.Operadora).filter(models.Operadora.cnpj == cnpj).first()
+    Tudo vem de uma única consulta (operadora com LEFT JOIN nas despesas
+    agregadas e nos trimestres), guardada em cache até a próxima carga.
+    """
+    return await cache.respond(
+        request, db, ("perfil", cnpj), lambda db: _operator_profile(db, cnpj), model=schemas.PerfilOperadora,
+    )
+
+def _operator_profile(db: Session, cnpj: str):
+    operadora, agregado, despesa = models.Operadora, models.DespesasAgregadas, models.DemonstracaoContabil
+    rows = (
+        db.query(
+            operadora.registro_ans, operadora.cnpj, operadora.razao_social, operadora.modalidade, operadora.uf,
+            agregado.total_despesas, agregado.media_trimestral, agregado.desvio_padrao,
+            despesa.ano, despesa.trimestre, despesa.valor_despesa,
+        )
+        .select_from(operadora)
+        .outerjoin(agregado, agregado.registro_ans == operadora.registro_ans)
+        .outerjoin(despesa, despesa.registro_ans == operadora.registro_ans)
+        .filter(operadora.registro_ans == _operator_key(db, cnpj))
+        .order_by(despesa.ano, despesa.trimestre)
+        .all()
+    )
 
-    if not operator:
+    if not rows:
         raise HTTPException(status_code=404, detail="Operadora não encontrada")
-    return operator.despesas
 
-@app.get("/api/estatisticas")
-def get_statistics(db: Session = Depends(get_db)):
+    first = rows[0]
+    return {
+        "operadora": {
+            "registro_ans": first.registro_ans,
+            "cnpj": first.cnpj,
+            "razao_social": first.razao_social,
+            "modalidade": first.modalidade,
+            "uf": first.uf,
+        },
+        "agregado": None if first.total_despesas is None else {
+            "total_despesas": first.total_despesas,
+            "media_trimestral": first.media_trimestral,
+            "desvio_padrao": first.desvio_padrao,
+        },
+        "despesas": [
+            {"ano": row.ano, "trimestre": row.trimestre, "valor_despesa": row.valor_despesa}
+            for row in rows if row.ano is not None
+        ],
+    }
+
+@app.get("/api/estatisticas", response_model=schemas.Estatisticas)
+async def get_statistics(request: Request, db: Session = Depends(get_session)):
+    return await cache.respond(request, db, ("estatisticas",), _statistics, model=schemas.Estatisticas)
+
+def _statistics(db: Session):
     data = db.query(
         models.DespesasAgregadas.uf,
         func.sum(models.DespesasAgregadas.total_despesas).label("total")
     ).group_by(models.DespesasAgregadas.uf).order_by(desc("total")).limit(5).all()
-    
+
     resultado = [{"uf": uf, "total": total} for uf, total in data]
 
     return {
@@ -84,6 +257,92 @@ def get_statistics(db: Session = Depends(get_db)):
         "mensagem": "Dados recuperados com sucesso"
     }
 
+@app.get("/api/analytics/crescimento", response_model=schemas.Crescimento)
+async def get_expense_growth(request: Request, limit: int = Query(5, ge=1, le=100), db: Session = Depends(get_session)):
+    """Operadoras com maior crescimento de despesas entre o primeiro e o último trimestre."""
+    view = models.mv_crescimento_despesas
+
+    def build(db):
+        rows = db.query(view).order_by(view.c.crescimento_pct.desc(), view.c.registro_ans).limit(limit).all()
+        return {"data": [row._asdict() for row in rows]}
+
+    return await cache.respond(request, db, ("analytics/crescimento", limit), build, model=schemas.Crescimento)
+
+@app.get("/api/analytics/despesas-uf", response_model=schemas.DistribuicaoUF)
+async def get_expenses_by_uf(request: Request, limit: int = Query(5, ge=1, le=27), db: Session = Depends(get_session)):
+    """UFs com maiores despesas totais e a média por operadora em cada uma."""
+    view = models.mv_despesas_uf
+
+    def build(db):
+        rows = db.query(view).order_by(view.c.despesa_total_estado.desc()).limit(limit).all()
+        return {"data": [row._asdict() for row in rows]}
+
+    return await cache.respond(request, db, ("analytics/despesas-uf", limit), build, model=schemas.DistribuicaoUF)
+
+@app.get("/api/analytics/acima-da-media", response_model=schemas.AcimaDaMedia)
+async def get_above_market_average(
+    request: Request,
+    minimo: int = Query(2, ge=1),
+    limit: int = Query(10, ge=1, le=1000),
+    db: Session = Depends(get_session)
+):
+    """Operadoras com despesas acima da média do mercado em pelo menos `minimo` trimestres."""
+    view = models.mv_operadoras_acima_media
+
+    def build(db):
+        query = db.query(view).filter(view.c.qtd_trimestres_acima >= minimo)
+        rows = query.order_by(view.c.qtd_trimestres_acima.desc(), view.c.razao_social).limit(limit).all()
+        return {"total": query.count(), "data": [row._asdict() for row in rows]}
+
+    return await cache.respond(
+        request, db, ("analytics/acima-da-media", minimo, limit), build, model=schemas.AcimaDaMedia,
+    )
+
+@app.get("/api/exportar/{tabela}")
+async def export_table(
+    tabela: str,
+    formato: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    uf: str = None,
+    modalidade: str = None,
+    ano_inicio: int = Query(None, ge=1900),
+    trimestre_inicio: int = Query(1, ge=1, le=4),
+    ano_fim: int = Query(None, ge=1900),
+    trimestre_fim: int = Query(4, ge=1, le=4),
+):
+    """
+    Exporta `operadoras`, `demonstracoes_contabeis` ou `despesas_agregadas`
+    em CSV ou NDJSON, em fluxo e sem passar pelo cache de respostas.
+    """
+    stmt = exports.build_query(tabela, uf, modalidade, ano_inicio, trimestre_inicio, ano_fim, trimestre_fim)
+    return exports.streaming_response(tabela, stmt, formato, gzip)
+
+# Respostas carregadas no cache antes de a API ser declarada pronta:
+# estatísticas e primeira página de operadoras (página inicial do frontend)
+WARMUP_RESPONSES = [
+    (("estatisticas",), _statistics, schemas.Estatisticas),
+    (("operadoras", 1, 10, "", ""), lambda db: _list_operators(db, 1, 10, None, None), schemas.OperadorasPagina),
+]
+
 @app.get("/")
 def health_check():
-    return {"status": "online", "message": "API rodando com sucesso!"}
\ No newline at end of file
+    """Liveness: o processo está de pé (não consulta o banco)."""
+    return {"status": "online", "message": "API rodando com sucesso!"}
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness: banco acessível, schema presente e caches aquecidos."""
+    if not lifecycle.state["ready"]:
+        return JSONResponse(status_code=503, content={"status": "indisponivel", "detalhe": lifecycle.state["detail"]})
+    try:
+        await run_in_threadpool(lifecycle.ping)
+    except SQLAlchemyError as exc:
+        return JSONResponse(status_code=503, content={"status": "indisponivel", "detalhe": f"banco indisponível: {exc.__class__.__name__}"})
+    return {"status": "pronto", "detalhe": lifecycle.state["detail"]}
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Latência por rota, SQL por requisição, pool e cache no formato do Prometheus."""
+    if not metrics.ENABLED:
+        raise HTTPException(status_code=404, detail="Métricas desativadas (API_METRICS=0)")
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
\ No newline at end of file
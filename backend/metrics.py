@@ -0,0 +1,304 @@
+"""
+Métricas da API no formato de exposição do Prometheus (`/metrics`).
+
+Um middleware ASGI mede cada requisição pela rota (o template, não a URL)
+e abre um contexto de requisição. Eventos do SQLAlchemy contam os comandos
+SQL e o tempo gasto no banco dentro desse contexto, que acompanha a
+execução no threadpool (modo sync) e no greenlet do modo async. A espera
+por uma conexão do pool também é medida. Requisições acima de
+API_SLOW_REQUEST_MS são registradas no log com os comandos mais lentos.
+"""
+
+import heapq
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from backend import cache
+
+ENABLED = os.getenv("API_METRICS", "1") == "1"
+# Requisições mais lentas que isso (ms) vão para o log com o SQL executado
+SLOW_REQUEST_MS = float(os.getenv("API_SLOW_REQUEST_MS", 500))
+SLOW_SQL_STATEMENTS = 5
+SLOW_SQL_MAX_CHARS = 1000
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Histograma com rótulos; os baldes são acumulados só na exposição."""
+
+    def __init__(self, name, help_text, buckets, labels=()):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.labels = tuple(labels)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0}
+            series["counts"][bisect_left(self.buckets, value)] += 1
+            series["sum"] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(key, list(s["counts"]), s["sum"]) for key, s in self._series.items()]
+
+        for label_values, counts, total in sorted(snapshot):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == "+Inf" else f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, label_values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, label_values)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, label_values)} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        lines += [f"{self.name}{_labels(self.labels, key)} {value}" for key, value in snapshot]
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    "api_request_duration_seconds", "Tempo de resposta por rota.",
+    LATENCY_BUCKETS, ("method", "route", "status"),
+)
+REQUEST_QUERIES = Histogram(
+    "api_request_sql_queries", "Comandos SQL executados por requisição.",
+    QUERY_COUNT_BUCKETS, ("method", "route"),
+)
+REQUEST_SQL_SECONDS = Histogram(
+    "api_request_sql_seconds", "Tempo gasto no banco por requisição.",
+    LATENCY_BUCKETS, ("method", "route"),
+)
+POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Espera para obter uma conexão do pool.",
+    POOL_WAIT_BUCKETS, ("engine",),
+)
+SLOW_REQUESTS = Counter(
+    "api_slow_requests_total", "Requisições acima de API_SLOW_REQUEST_MS.", ("method", "route"),
+)
+
+_engines = []
+
+
+class RequestStats:
+    """Comandos SQL e espera pelo pool acumulados durante uma requisição."""
+
+    __slots__ = ("queries", "sql_seconds", "pool_wait_seconds", "slowest", "_order")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+        self.slowest = []
+        self._order = 0
+
+    def record_query(self, statement, elapsed):
+        self.queries += 1
+        self.sql_seconds += elapsed
+        self._order += 1
+        item = (elapsed, self._order, statement)
+        if len(self.slowest) < SLOW_SQL_STATEMENTS:
+            heapq.heappush(self.slowest, item)
+        else:
+            heapq.heappushpop(self.slowest, item)
+
+
+_current = ContextVar("api_request_stats", default=None)
+_checkout_start = ContextVar("api_pool_checkout_start", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["metrics_query_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.pop("metrics_query_start", None)
+    stats = _current.get()
+    if start is not None and stats is not None:
+        stats.record_query(statement, time.perf_counter() - start)
+
+
+def _before_orm_execute(orm_execute_state):
+    # Sem transação aberta, a sessão pede uma conexão ao pool logo em seguida
+    if orm_execute_state.session.in_transaction():
+        _checkout_start.set(None)
+    else:
+        _checkout_start.set(time.perf_counter())
+
+
+def _pool_checkout(label):
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        start = _checkout_start.get()
+        if start is None:
+            return
+        _checkout_start.set(None)
+        elapsed = time.perf_counter() - start
+        POOL_WAIT.observe(elapsed, label)
+        stats = _current.get()
+        if stats is not None:
+            stats.pool_wait_seconds += elapsed
+
+    return on_checkout
+
+
+def instrument_engine(engine, label):
+    """
+    Registra os eventos de SQL da engine (síncrona; no modo async, use
+    `async_engine.sync_engine`) e passa a medir a espera pelo pool.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    # O pool não tem evento anterior ao checkout. A espera vai do início do
+    # comando na sessão (que ainda não tem conexão) até o evento "checkout".
+    # Registrado na engine, ele passa para o pool recriado por `dispose()`.
+    if not event.contains(Session, "do_orm_execute", _before_orm_execute):
+        event.listen(Session, "do_orm_execute", _before_orm_execute)
+    event.listen(engine, "checkout", _pool_checkout(label))
+    _engines.append((label, engine))
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mede as requisições HTTP e registra as lentas."""
+
+    def __init__(self, app, routes):
+        self.app = app
+        self.routes = routes
+        self._templates = None
+
+    def _route(self, scope):
+        if self._templates is None:
+            self._templates = {
+                route.endpoint: route.path for route in self.routes if hasattr(route, "endpoint")
+            }
+        # Rotas inexistentes ficam agrupadas, para não criar uma série por URL
+        return self._templates.get(scope.get("endpoint"), "sem_rota")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current.reset(token)
+            self._observe(scope, status, time.perf_counter() - start, stats)
+
+    def _observe(self, scope, status, elapsed, stats):
+        method, route = scope["method"], self._route(scope)
+        REQUEST_DURATION.observe(elapsed, method, route, str(status))
+        REQUEST_QUERIES.observe(stats.queries, method, route)
+        REQUEST_SQL_SECONDS.observe(stats.sql_seconds, method, route)
+
+        if elapsed * 1000 >= SLOW_REQUEST_MS:
+            SLOW_REQUESTS.inc(method, route)
+            _log_slow_request(scope, status, elapsed, stats)
+
+
+def _log_slow_request(scope, status, elapsed, stats):
+    path = scope["path"] + ("?" + scope["query_string"].decode("latin-1") if scope.get("query_string") else "")
+    lines = [
+        f"Requisição lenta: {scope['method']} {path} -> {status} em {elapsed * 1000:.0f} ms; "
+        f"{stats.queries} comando(s) SQL em {stats.sql_seconds * 1000:.0f} ms, "
+        f"{stats.pool_wait_seconds * 1000:.1f} ms aguardando o pool"
+    ]
+    for query_elapsed, _, statement in sorted(stats.slowest, reverse=True):
+        text = " ".join(statement.split())
+        if len(text) > SLOW_SQL_MAX_CHARS:
+            text = text[:SLOW_SQL_MAX_CHARS] + "..."
+        lines.append(f"  {query_elapsed * 1000:.1f} ms: {text}")
+    logger.warning("\n".join(lines))
+
+
+def _gauge(name, help_text, samples):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    return lines + [f"{name}{labels} {_number(value)}" for labels, value in samples]
+
+
+def render():
+    """Todas as métricas no formato texto do Prometheus."""
+    lines = []
+    for metric in (REQUEST_DURATION, REQUEST_QUERIES, REQUEST_SQL_SECONDS, POOL_WAIT, SLOW_REQUESTS):
+        lines += metric.render()
+
+    pool_samples = []
+    for label, engine in _engines:
+        pool = engine.pool
+        for state, value in (
+            ("size", pool.size()), ("checked_out", pool.checkedout()),
+            ("idle", pool.checkedin()), ("overflow", max(pool.overflow(), 0)),
+        ):
+            pool_samples.append((_labels(("engine", "state"), (label, state)), value))
+    lines += _gauge("db_pool_connections", "Conexões do pool por estado.", pool_samples)
+
+    responses = cache.responses
+    lines += _gauge("api_response_cache_bytes", "Memória ocupada pelo cache de respostas.", [("", responses.size)])
+    lines += [
+        "# HELP api_response_cache_requests_total Consultas ao cache de respostas.",
+        "# TYPE api_response_cache_requests_total counter",
+        f'api_response_cache_requests_total{{result="hit"}} {responses.hits}',
+        f'api_response_cache_requests_total{{result="miss"}} {responses.misses}',
+    ]
+    return "\n".join(lines) + "\n"
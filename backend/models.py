@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, Date
+from sqlalchemy import Column, Integer, BigInteger, String, Numeric, ForeignKey, Date, DateTime, UniqueConstraint, Computed, Index, MetaData, Table, func
 from sqlalchemy.orm import relationship
 from backend.database import Base
 
@@ -6,15 +6,24 @@ class Operadora(Base):
     __tablename__ = "operadoras"
 
     registro_ans = Column(Integer, primary_key=True, index=True)
-    cnpj = Column(String)
+    cnpj = Column(String, index=True)
     razao_social = Column(String)
     modalidade = Column(String)
     uf = Column(String)
+    cnpj_digitos = Column(String(20), Computed(r"regexp_replace(cnpj, '\D', '', 'g')", persisted=True))
 
     despesas = relationship("DemonstracaoContabil", back_populates="operadora")
 
+    __table_args__ = (
+        # O índice de trigramas da razão social depende de extensões e está em sql/create_tables.sql
+        Index("ix_operadoras_cnpj_digitos", "cnpj_digitos", postgresql_ops={"cnpj_digitos": "text_pattern_ops"}),
+    )
+
 class DemonstracaoContabil(Base):
     __tablename__ = "demonstracoes_contabeis"
+    __table_args__ = (
+        UniqueConstraint("registro_ans", "ano", "trimestre", name="uq_demonstracoes_periodo"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     registro_ans = Column(Integer, ForeignKey("operadoras.registro_ans"))
@@ -32,3 +41,39 @@ class DespesasAgregadas(Base):
     total_despesas = Column(Numeric(18, 2))
     media_trimestral = Column(Numeric(18, 2))
     desvio_padrao = Column(Numeric(18, 2))
+
+class VersaoDados(Base):
+    __tablename__ = "versao_dados"
+    id = Column(Integer, primary_key=True)
+    versao = Column(BigInteger, nullable=False, default=0)
+    atualizado_em = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# Visões materializadas das queries analíticas (sql/create_tables.sql).
+# Ficam fora do Base.metadata para que o create_all não as crie como tabelas.
+analytics_metadata = MetaData()
+
+mv_crescimento_despesas = Table(
+    "mv_crescimento_despesas", analytics_metadata,
+    Column("registro_ans", Integer, primary_key=True),
+    Column("razao_social", String),
+    Column("valor_inicial", Numeric(18, 2)),
+    Column("valor_final", Numeric(18, 2)),
+    Column("crescimento_pct", Numeric),
+)
+
+mv_despesas_uf = Table(
+    "mv_despesas_uf", analytics_metadata,
+    Column("uf", String, primary_key=True),
+    Column("despesa_total_estado", Numeric(18, 2)),
+    Column("media_por_operadora", Numeric(18, 2)),
+    Column("qtd_operadoras", BigInteger),
+)
+
+mv_operadoras_acima_media = Table(
+    "mv_operadoras_acima_media", analytics_metadata,
+    Column("registro_ans", Integer, primary_key=True),
+    Column("razao_social", String),
+    Column("qtd_trimestres_acima", BigInteger),
+    Column("qtd_trimestres", BigInteger),
+)
@@ -0,0 +1,27 @@
+import base64
+import json
+
+from fastapi import HTTPException
+
+
+def encode_cursor(last_key: int, score: float = None) -> str:
+    """
+    Gera o token opaco que aponta para o registro seguinte a `last_key`.
+    Em buscas ordenadas por relevância, `score` guarda a relevância do último item.
+    """
+    payload = {"after": last_key}
+    if score is not None:
+        payload["score"] = score
+    data = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_cursor(token: str):
+    """Recupera a chave de ordenação (e a relevância, se houver) contida no token."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        score = payload.get("score")
+        return int(payload["after"]), None if score is None else float(score)
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido")
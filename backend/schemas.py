@@ -0,0 +1,96 @@
+"""
+Formato das respostas da API.
+
+As rotas montam as respostas com consultas por colunas (sem construir
+entidades ORM). Estes modelos documentam o contrato no Swagger, definem as
+colunas projetadas em cada consulta e validam cada resposta antes de ela
+entrar no cache (`serialization.dumps_validated`).
+"""
+
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class Operadora(BaseModel):
+    registro_ans: int
+    cnpj: Optional[str] = None
+    razao_social: Optional[str] = None
+    modalidade: Optional[str] = None
+    uf: Optional[str] = None
+
+
+class OperadorasPagina(BaseModel):
+    data: List[Operadora]
+    total: int
+    page: int
+    limit: int
+    next: Optional[str] = None
+
+
+class Despesa(BaseModel):
+    ano: int
+    trimestre: int
+    valor_despesa: Optional[float] = None
+
+
+class Agregado(BaseModel):
+    total_despesas: Optional[float] = None
+    media_trimestral: Optional[float] = None
+    desvio_padrao: Optional[float] = None
+
+
+class PerfilOperadora(BaseModel):
+    operadora: Operadora
+    agregado: Optional[Agregado] = None
+    despesas: List[Despesa]
+
+
+class DespesaUF(BaseModel):
+    uf: Optional[str] = None
+    total: Optional[float] = None
+
+
+class Estatisticas(BaseModel):
+    por_uf: List[DespesaUF]
+    mensagem: str
+
+
+class CrescimentoOperadora(BaseModel):
+    registro_ans: int
+    razao_social: Optional[str] = None
+    valor_inicial: float
+    valor_final: float
+    crescimento_pct: float
+
+
+class Crescimento(BaseModel):
+    data: List[CrescimentoOperadora]
+
+
+class DespesasPorUF(BaseModel):
+    uf: str
+    despesa_total_estado: Optional[float] = None
+    media_por_operadora: Optional[float] = None
+    qtd_operadoras: int
+
+
+class DistribuicaoUF(BaseModel):
+    data: List[DespesasPorUF]
+
+
+class OperadoraAcimaMedia(BaseModel):
+    registro_ans: int
+    razao_social: Optional[str] = None
+    qtd_trimestres_acima: int
+    qtd_trimestres: int
+
+
+class AcimaDaMedia(BaseModel):
+    total: int
+    data: List[OperadoraAcimaMedia]
+
+
+def columns(entity, schema):
+    """Colunas de `entity` correspondentes aos campos do schema, na mesma ordem."""
+    return [getattr(entity, name) for name in schema.model_fields]
@@ -0,0 +1,76 @@
+import re
+import unicodedata
+
+from sqlalchemy import and_, case, func, or_, text
+from sqlalchemy.orm import Query, Session
+
+from backend import models
+
+CNPJ_TERM = re.compile(r"[\d./\s-]+")
+
+_trigram_available = None
+
+
+def normalize_term(term: str) -> str:
+    """Remove acentos e caixa do termo buscado ("Saúde" -> "saude")."""
+    decomposed = unicodedata.normalize("NFKD", term.strip().lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def escape_like(term: str) -> str:
+    """Escapa os curingas do LIKE para que o termo seja buscado literalmente."""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def trigram_available(db: Session) -> bool:
+    """
+    Verifica (uma única vez) se o banco tem pg_trgm e a função f_unaccent,
+    criadas em sql/create_tables.sql. Sem elas, a busca volta ao ILIKE simples.
+    """
+    global _trigram_available
+    if _trigram_available is None:
+        _trigram_available = bool(db.execute(text(
+            "SELECT to_regprocedure('f_unaccent(text)') IS NOT NULL "
+            "AND EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')"
+        )).scalar())
+    return _trigram_available
+
+
+def apply_search(db: Session, query: Query, term: str):
+    """
+    Filtra operadoras por razão social (substring, sem diferenciar acentos)
+    ou pelo início do CNPJ (apenas dígitos).
+
+    Retorna a consulta filtrada e a expressão de relevância usada na
+    ordenação: prefixo de CNPJ, depois início da razão social e, por fim,
+    a similaridade por trigramas. Sem pg_trgm a relevância é None.
+    """
+    # Só termos formados por dígitos e pontuação de CNPJ ("11.222", "11222333/0001") buscam pelo CNPJ
+    digits = re.sub(r"\D", "", term) if CNPJ_TERM.fullmatch(term.strip()) else ""
+    cnpj_match = models.Operadora.cnpj_digitos.like(digits + "%") if digits else None
+
+    if trigram_available(db):
+        normalized = normalize_term(term)
+        name = func.lower(func.f_unaccent(models.Operadora.razao_social))
+        name_match = name.like(f"%{escape_like(normalized)}%", escape="\\")
+
+        score = (
+            case((name.like(f"{escape_like(normalized)}%", escape="\\"), 1.0), else_=0.0)
+            + func.similarity(name, normalized)
+        )
+        if cnpj_match is not None:
+            score = score + case((cnpj_match, 2.0), else_=0.0)
+    else:
+        name_match = models.Operadora.razao_social.ilike(f"%{escape_like(term)}%", escape="\\")
+        score = None
+
+    condition = name_match if cnpj_match is None else or_(name_match, cnpj_match)
+    return query.filter(condition), score
+
+
+def after_cursor(score, score_value: float, registro_ans: int):
+    """Condição de paginação por chave para resultados ordenados por relevância."""
+    return or_(
+        score < score_value,
+        and_(score == score_value, models.Operadora.registro_ans > registro_ans),
+    )
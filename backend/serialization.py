@@ -0,0 +1,55 @@
+"""
+Serialização JSON das respostas da API.
+
+As rotas entregam apenas tipos simples (dicts, listas, números, texto e
+`Decimal` das colunas NUMERIC). As respostas das rotas passam pelo modelo
+declarado em `response_model` (`dumps_validated`), que confere tipos e
+campos obrigatórios, descarta campos extras e gera o JSON no pydantic-core.
+Para o restante, `dumps` usa o `orjson`, sem a introspecção do
+`jsonable_encoder`; sem o `orjson` instalado, o caminho padrão do FastAPI.
+"""
+
+import json
+from decimal import Decimal
+from functools import lru_cache
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import ResponseValidationError
+from pydantic import TypeAdapter, ValidationError
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    """Serializa `content` em JSON (UTF-8); `Decimal` vira número."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+@lru_cache(maxsize=None)
+def _adapter(model):
+    return TypeAdapter(model)
+
+
+def dumps_validated(model, content) -> bytes:
+    """
+    Valida `content` com `model` (um modelo ou tipo como `List[Modelo]`) e
+    serializa o resultado. Uma coluna ausente ou renomeada gera o mesmo erro
+    500 (`ResponseValidationError`) que o FastAPI gera ao validar a resposta.
+    """
+    adapter = _adapter(model)
+    try:
+        value = adapter.validate_python(content)
+    except ValidationError as exc:
+        raise ResponseValidationError(errors=exc.errors(include_url=False), body=content) from exc
+    return adapter.dump_json(value)
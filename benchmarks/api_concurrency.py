@@ -0,0 +1,109 @@
+"""
+Vazão da API nos modos de acesso ao banco sync (threadpool) e async (asyncpg).
+
+Para cada modo, sobe um uvicorn com API_DB_MODE correspondente e dispara
+requisições com 50 a 500 clientes simultâneos, informando requisições/s,
+p50/p95 e erros. Por padrão o cache de respostas é desligado
+(API_RESPONSE_CACHE_BYTES=0), para que cada requisição chegue ao banco.
+
+Uso (na raiz do projeto, com o banco carregado):
+    python -m benchmarks.api_concurrency --clients 50 100 250 500 --duration 10
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def start_server(mode, port, with_cache):
+    env = dict(os.environ, API_DB_MODE=mode)
+    if not with_cache:
+        env["API_RESPONSE_CACHE_BYTES"] = "0"
+
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"Servidor no modo {mode} não respondeu na porta {port}")
+
+
+def sample_paths(base_url, size=200):
+    """Mistura listagens paginadas e perfis de operadoras reais."""
+    operators = httpx.get(f"{base_url}/api/operadoras", params={"limit": size}).json()["data"]
+    cnpjs = [op["cnpj"] for op in operators if op.get("cnpj")]
+
+    paths = [f"/api/operadoras?page={page}&limit=10" for page in range(1, 11)]
+    paths += [f"/api/operadoras/{cnpj}/perfil" for cnpj in cnpjs]
+    paths += ["/api/estatisticas"]
+    return paths
+
+
+async def load(base_url, paths, clients, duration):
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+    rng = random.Random(42)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=httpx.Limits(max_connections=clients)) as client:
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(rng.choice(paths))
+                    if response.status_code >= 500:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    return len(latencies) / elapsed, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 100, 250, 500])
+    parser.add_argument("--duration", type=float, default=10.0, help="segundos por rodada")
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"], choices=["sync", "async"])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--with-cache", action="store_true", help="mantém o cache de respostas ligado")
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    print(f"{'modo':<7}{'clientes':>10}{'req/s':>10}{'p50 (ms)':>11}{'p95 (ms)':>11}{'erros':>8}")
+
+    for mode in args.modes:
+        process = start_server(mode, args.port, args.with_cache)
+        try:
+            paths = sample_paths(base_url)
+            asyncio.run(load(base_url, paths, 10, 1.0))  # aquecimento do pool de conexões
+
+            for clients in args.clients:
+                rate, latencies, errors = asyncio.run(load(base_url, paths, clients, args.duration))
+                p95 = statistics.quantiles(latencies, n=100)[94] if len(latencies) > 1 else latencies[0]
+                print(f"{mode:<7}{clients:>10}{rate:>10,.0f}{statistics.median(latencies):>11.1f}{p95:>11.1f}{errors:>8}")
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Microbenchmark das normalizações linha a linha (`.apply`) contra as
+versões vetorizadas de `processing/normalizers.py`.
+
+Mede apenas a vazão (linhas/s); a equivalência dos resultados é verificada
+em tests/test_normalizers.py. As amostras vêm dos arquivos reais em
+data/raw quando disponíveis; caso contrário são gerados valores no mesmo
+formato dos arquivos da ANS.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.normalizers_bench --rows 1000000
+"""
+
+import argparse
+import glob
+import os
+import random
+import re
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from processing import normalizers
+from processing.data_processor import RAW_DIR, clean_currency
+from processing.data_enrichment import CADOP_CSV, format_cnpj
+
+
+def load_samples(limit=200_000):
+    """Carrega valores e CNPJs reais de data/raw, se existirem."""
+    values, cnpjs = [], []
+
+    for zip_path in sorted(glob.glob(os.path.join(RAW_DIR, "*.zip"))):
+        with zipfile.ZipFile(zip_path) as zf:
+            for name in zf.namelist():
+                if not name.lower().endswith(".csv"):
+                    continue
+                with zf.open(name) as fh:
+                    df = pd.read_csv(
+                        fh, sep=";", encoding="latin1", dtype=str,
+                        usecols=["VL_SALDO_FINAL"], nrows=limit,
+                    )
+                values.extend(df["VL_SALDO_FINAL"].tolist())
+
+    if os.path.exists(CADOP_CSV):
+        df = pd.read_csv(CADOP_CSV, sep=";", encoding="latin1", dtype=str, usecols=["CNPJ"])
+        cnpjs = df["CNPJ"].tolist()
+
+    return values, cnpjs
+
+
+def synthetic_samples(size=10_000):
+    """Gera valores no formato dos arquivos da ANS."""
+    rng = random.Random(42)
+    values = [
+        f"{rng.randint(-10**6, 10**9):,}".replace(",", ".") + f",{rng.randint(0, 99):02d}"
+        for _ in range(size)
+    ]
+    values += ["0", "abc"]
+    cnpjs = [str(rng.randint(10**12, 10**14 - 1)).zfill(14) for _ in range(size)]
+    cnpjs += ["123", "11.222.333/0001-81"]
+    return values, cnpjs
+
+
+# Acrescentados a qualquer amostra, real ou sintética
+MISSING = ["", None, np.nan]
+
+
+def repeat_to(items, rows):
+    """Repete as amostras até `rows` linhas, mantendo NaN e None como valores ausentes."""
+    return pd.Series((items * (rows // len(items) + 1))[:rows], dtype=object)
+
+
+def measure(func, series):
+    start = time.perf_counter()
+    func(series)
+    elapsed = time.perf_counter() - start
+    return len(series) / elapsed if elapsed > 0 else float("inf")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    values, cnpjs = load_samples()
+    source = "data/raw"
+    if not values or not cnpjs:
+        values, cnpjs = synthetic_samples()
+        source = "sintético"
+    values, cnpjs = values + MISSING, cnpjs + MISSING
+
+    valores = repeat_to(values, args.rows)
+    cnpj = repeat_to(cnpjs, args.rows)
+    razao = "Operadora ANS " + cnpj.str[-6:]
+    decimais = repeat_to([f"{v:.2f}".replace(".", ",") for v in valores.head(10_000).map(clean_currency)], args.rows)
+
+    cases = [
+        ("clean_currency", lambda s: s.apply(clean_currency), normalizers.parse_currency, valores),
+        ("valor decimal", lambda s: s.apply(lambda x: float(str(x).replace(",", "."))), normalizers.parse_decimal_comma, decimais),
+        ("format_cnpj", lambda s: s.apply(format_cnpj), normalizers.format_cnpj, cnpj),
+        ("CNPJ válido", lambda s: s.apply(lambda x: len(re.sub(r"\D", "", str(x))) == 14), normalizers.is_valid_cnpj, cnpj),
+        ("REG_ANS", lambda s: s.apply(lambda x: str(x).split(" ")[-1]), normalizers.reg_ans_from_razao, razao),
+    ]
+
+    print(f"Amostras: {source} | {args.rows:,} linhas por caso\n")
+    print(f"{'normalização':<16}{'antes (linhas/s)':>20}{'depois (linhas/s)':>20}{'ganho':>8}")
+
+    for name, before, after, series in cases:
+        rate_before = measure(before, series)
+        rate_after = measure(after, series)
+        print(f"{name:<16}{rate_before:>20,.0f}{rate_after:>20,.0f}{rate_after / rate_before:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Tempo, vazão e pico de memória das etapas do pipeline sobre dados sintéticos.
+
+Gera (ou reaproveita) uma base com `benchmarks/synthetic_data.py` e executa
+`data_processor.run`, `data_enrichment.run` e `db_importer.run`, cada um em
+um processo separado, para que o pico de RSS de uma etapa não contamine a
+seguinte. Os resultados são acrescentados a um histórico JSON e comparados
+com a mediana das últimas execuções na mesma escala: se alguma etapa ficar
+mais lenta (ou usar mais memória) que o limite, o script termina com código 1.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.pipeline_bench --rows 1000000
+    python -m benchmarks.pipeline_bench --rows 10000000 --threshold 0.15 --repeat 3
+"""
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks import synthetic_data
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORY_PATH = os.path.join(ROOT_DIR, "data", "benchmarks", "pipeline_history.json")
+
+STAGES = {
+    "processing": ("processing.data_processor", "run"),
+    "enrichment": ("processing.data_enrichment", "run"),
+    "sql": ("db_importer", "run"),
+}
+
+
+def _peak_rss_mb(who):
+    if resource is None:
+        return None
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def run_child(stage, result_path):
+    """Executa uma etapa no diretório atual e grava as medições em `result_path`."""
+    module, func = STAGES[stage]
+    run = getattr(importlib.import_module(module), func)
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+
+    peak = _peak_rss_mb(resource.RUSAGE_SELF) if resource else None
+    if resource:
+        # Workers do pool de processos (ANS_PROCESS_WORKERS > 1)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu += children.ru_utime + children.ru_stime
+        peak = max(peak, _peak_rss_mb(resource.RUSAGE_CHILDREN))
+
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump({"seconds": elapsed, "cpu_seconds": cpu, "peak_rss_mb": peak}, f)
+
+
+def _count_rows(path):
+    with open(path, "rb") as f:
+        return max(sum(1 for _ in f) - 1, 0)
+
+
+def stage_rows(stage, workdir, spec):
+    """Linhas de entrada de cada etapa, usadas no cálculo de linhas/s."""
+    processed = os.path.join(workdir, "data", "processed")
+    if stage == "processing":
+        return spec["rows"]
+    consolidado = _count_rows(os.path.join(processed, "consolidado_despesas.csv"))
+    if stage == "enrichment":
+        return consolidado
+    return spec["cadop_rows"] + consolidado + _count_rows(os.path.join(processed, "despesas_agregadas.csv"))
+
+
+def measure_stage(stage, workdir, log):
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+        result_path = tmp.name
+    try:
+        env = dict(os.environ, PYTHONPATH=ROOT_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""))
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.pipeline_bench", "--child", stage, "--result", result_path],
+            cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT, check=True,
+        )
+        with open(result_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        os.remove(result_path)
+
+
+def prepare_data(workdir, args):
+    """Reaproveita a base sintética de `workdir` se ela tiver os mesmos parâmetros."""
+    spec = synthetic_data.load_spec(workdir)
+    wanted = {"rows": args.rows, "quarters": args.quarters, "operators": args.operators, "seed": args.seed}
+    if spec and all(spec.get(key) == value for key, value in wanted.items()):
+        print(f"[INFO] Reaproveitando base sintética em {workdir}")
+        return spec
+
+    print(f"[INFO] Gerando base sintética com {args.rows:,} linhas em {workdir}...")
+    return synthetic_data.generate(workdir, args.rows, args.quarters, args.operators, args.seed)
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_history(path, history):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(history, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def baseline(history, entry, runs):
+    """Mediana de linhas/s e pico de RSS por etapa nas últimas `runs` execuções comparáveis."""
+    same_scale = [
+        previous for previous in history
+        if previous["scale"] == entry["scale"] and previous["host"] == entry["host"]
+    ][-runs:]
+
+    result = {}
+    for stage in entry["stages"]:
+        samples = [previous["stages"][stage] for previous in same_scale if stage in previous["stages"]]
+        if not samples:
+            continue
+        rss = [s["peak_rss_mb"] for s in samples if s["peak_rss_mb"] is not None]
+        result[stage] = {
+            "rows_per_s": statistics.median(s["rows_per_s"] for s in samples),
+            "peak_rss_mb": statistics.median(rss) if rss else None,
+        }
+    return result
+
+
+def regressions(entry, base, threshold):
+    """Etapas mais lentas ou mais pesadas que a base além de `threshold` (fração)."""
+    found = []
+    for stage, current in entry["stages"].items():
+        reference = base.get(stage)
+        if reference is None:
+            continue
+        if current["rows_per_s"] < reference["rows_per_s"] * (1 - threshold):
+            found.append(f"{stage}: {current['rows_per_s']:,.0f} linhas/s (base {reference['rows_per_s']:,.0f})")
+        if (
+            current["peak_rss_mb"] is not None and reference["peak_rss_mb"] is not None
+            and current["peak_rss_mb"] > reference["peak_rss_mb"] * (1 + threshold)
+        ):
+            found.append(f"{stage}: pico de {current['peak_rss_mb']:,.0f} MB (base {reference['peak_rss_mb']:,.0f} MB)")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="linhas contábeis sintéticas (10 mil a 50 milhões)")
+    parser.add_argument("--quarters", type=int, default=3)
+    parser.add_argument("--operators", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=1, help="execuções por etapa (vale a mais rápida)")
+    parser.add_argument("--workdir", help="diretório da base sintética (padrão: temporário por escala)")
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--threshold", type=float, default=0.2, help="piora tolerada em relação à base (0.2 = 20%%)")
+    parser.add_argument("--baseline-runs", type=int, default=5, help="execuções anteriores usadas na mediana")
+    parser.add_argument("--no-save", action="store_true", help="não grava esta execução no histórico")
+    parser.add_argument("--child", choices=list(STAGES), help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.result)
+        return
+
+    workdir = os.path.abspath(args.workdir or os.path.join(tempfile.gettempdir(), f"ans_bench_{args.rows}"))
+    spec = prepare_data(workdir, args)
+    log_path = os.path.join(workdir, "pipeline_bench.log")
+
+    entry = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "scale": {"rows": args.rows, "quarters": args.quarters, "operators": args.operators, "seed": args.seed},
+        "stages": {},
+    }
+
+    print(f"\n{'etapa':<12}{'tempo (s)':>11}{'CPU (s)':>10}{'linhas':>13}{'linhas/s':>13}{'pico RSS (MB)':>15}")
+    with open(log_path, "w", encoding="utf-8") as log:
+        for stage in args.stages:
+            runs = [measure_stage(stage, workdir, log) for _ in range(args.repeat)]
+            best = min(runs, key=lambda r: r["seconds"])
+            peaks = [r["peak_rss_mb"] for r in runs if r["peak_rss_mb"] is not None]
+            rows = stage_rows(stage, workdir, spec)
+
+            result = {
+                "seconds": round(best["seconds"], 4),
+                "cpu_seconds": round(best["cpu_seconds"], 4),
+                "rows": rows,
+                "rows_per_s": round(rows / best["seconds"], 1) if best["seconds"] > 0 else None,
+                "peak_rss_mb": round(max(peaks), 1) if peaks else None,
+            }
+            entry["stages"][stage] = result
+
+            rss = f"{result['peak_rss_mb']:>15,.1f}" if result["peak_rss_mb"] is not None else f"{'-':>15}"
+            print(f"{stage:<12}{result['seconds']:>11.2f}{result['cpu_seconds']:>10.2f}{rows:>13,}{result['rows_per_s']:>13,.0f}{rss}")
+
+    print(f"\n[INFO] Saída das etapas em {log_path}")
+
+    history = load_history(args.history)
+    found = regressions(entry, baseline(history, entry, args.baseline_runs), args.threshold)
+
+    if not args.no_save:
+        history.append(entry)
+        save_history(args.history, history)
+        print(f"[INFO] Histórico atualizado: {args.history}")
+
+    if found:
+        print(f"\n[REGRESSÃO] Piora acima de {args.threshold:.0%} em relação à base:")
+        for line in found:
+            print(f"  - {line}")
+        sys.exit(1)
+
+    print("[OK] Nenhuma regressão acima do limite.")
+
+
+if __name__ == "__main__":
+    main()
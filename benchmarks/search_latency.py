@@ -0,0 +1,98 @@
+"""
+Latência da busca de operadoras (`/api/operadoras?search=`) no banco configurado.
+
+Sorteia termos a partir das próprias operadoras carregadas (trechos da razão
+social, com e sem acento, e prefixos de CNPJ), executa a mesma consulta da
+API (filtro, total e primeira página) e informa p50/p95 por tipo de termo.
+Termina com código 1 se o p95 ficar acima de `--target-ms`.
+
+Uso (na raiz do projeto, após a carga do banco):
+    python -m benchmarks.search_latency --queries 500 --target-ms 50
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+
+from sqlalchemy import desc
+
+from backend import models, search
+from backend.database import SessionLocal
+
+
+def sample_terms(db, count, seed=42):
+    """Gera termos de busca de nome e de CNPJ a partir das operadoras cadastradas."""
+    rng = random.Random(seed)
+    rows = db.query(models.Operadora.razao_social, models.Operadora.cnpj_digitos).all()
+    names = [r.razao_social for r in rows if r.razao_social]
+    cnpjs = [r.cnpj_digitos for r in rows if r.cnpj_digitos]
+
+    terms = {"nome": [], "cnpj": []}
+    for _ in range(count):
+        if names:
+            words = [w for w in rng.choice(names).split() if len(w) >= 3] or ["SAUDE"]
+            word = rng.choice(words)
+            terms["nome"].append(search.normalize_term(word) if rng.random() < 0.5 else word)
+        if cnpjs:
+            terms["cnpj"].append(rng.choice(cnpjs)[:rng.randint(4, 10)])
+    return terms
+
+
+def run_query(db, term, limit=10):
+    """Executa a busca como a API: total e primeira página ordenada."""
+    query, score = search.apply_search(db, db.query(models.Operadora), term)
+    query.count()
+    if score is None:
+        page = query.order_by(models.Operadora.registro_ans)
+    else:
+        page = query.add_columns(score.label("score")).order_by(desc("score"), models.Operadora.registro_ans)
+    return page.limit(limit + 1).all()
+
+
+def percentile(values, pct):
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1] if len(values) > 1 else values[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--queries", type=int, default=500, help="consultas por tipo de termo")
+    parser.add_argument("--target-ms", type=float, default=50.0, help="p95 máximo aceito, em ms")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        total = db.query(models.Operadora).count()
+        mode = "trigramas" if search.trigram_available(db) else "ILIKE (sem pg_trgm)"
+        terms = sample_terms(db, args.queries)
+
+        print(f"Operadoras: {total:,} | busca: {mode} | {args.queries} consultas por tipo\n")
+        print(f"{'termo':<8}{'p50 (ms)':>12}{'p95 (ms)':>12}{'máx (ms)':>12}")
+
+        worst_p95 = 0.0
+        for kind, values in terms.items():
+            if not values:
+                continue
+            run_query(db, values[0])  # aquecimento do plano e do cache do banco
+
+            timings = []
+            for term in values:
+                start = time.perf_counter()
+                run_query(db, term)
+                timings.append((time.perf_counter() - start) * 1000)
+
+            p95 = percentile(timings, 95)
+            worst_p95 = max(worst_p95, p95)
+            print(f"{kind:<8}{percentile(timings, 50):>12.2f}{p95:>12.2f}{max(timings):>12.2f}")
+    finally:
+        db.close()
+
+    if worst_p95 > args.target_ms:
+        print(f"\n[FALHA] p95 de {worst_p95:.2f} ms acima da meta de {args.target_ms:.0f} ms.")
+        sys.exit(1)
+    print(f"\n[OK] p95 dentro da meta de {args.target_ms:.0f} ms.")
+
+
+if __name__ == "__main__":
+    main()
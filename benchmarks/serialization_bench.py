@@ -0,0 +1,126 @@
+"""
+Tempo de serialização por linha das respostas da API: entidades ORM via
+`jsonable_encoder` (caminho anterior) contra linhas projetadas por coluna,
+validadas pelo modelo da rota e serializadas por `backend/serialization.py`.
+
+Antes de medir, confere que os dois caminhos geram o mesmo JSON. Com
+`--db`, mede também a leitura de uma página do banco (DATABASE_URL) com
+entidades ORM e com projeção de colunas.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.serialization_bench --rows 1000
+"""
+
+import argparse
+import json
+import random
+import time
+from decimal import Decimal
+from functools import partial
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+
+from backend import models, schemas, serialization
+
+
+def legacy_dumps(content):
+    """O que o FastAPI fazia ao receber objetos ORM sem response_model."""
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def synthetic_rows(rows, seed=42):
+    rng = random.Random(seed)
+    operators = [
+        {
+            "registro_ans": 300000 + i,
+            "cnpj": str(rng.randint(10**12, 10**14 - 1)).zfill(14),
+            "razao_social": f"OPERADORA DE SAÚDE {i} LTDA",
+            "modalidade": rng.choice(["Medicina de Grupo", "Cooperativa Médica", "Autogestão"]),
+            "uf": rng.choice(["SP", "RJ", "MG", None]),
+        }
+        for i in range(rows)
+    ]
+    expenses = [
+        {
+            "ano": 2020 + i // 4 % 6,
+            "trimestre": i % 4 + 1,
+            "valor_despesa": Decimal(f"{rng.randint(0, 10**9)}.{rng.randint(0, 99):02d}"),
+        }
+        for i in range(rows)
+    ]
+    return operators, expenses
+
+
+def per_row_us(func, payload, rows, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(payload)
+    return (time.perf_counter() - start) / repeat / rows * 1e6
+
+
+def bench_serialization(rows, repeat):
+    operators, expenses = synthetic_rows(rows)
+    cases = [
+        ("operadoras", [models.Operadora(**op) for op in operators], operators, schemas.Operadora),
+        ("despesas", [models.DemonstracaoContabil(**ex) for ex in expenses], expenses, schemas.Despesa),
+    ]
+
+    print(f"Serialização de páginas com {rows:,} linhas (µs por linha)\n")
+    print(f"{'página':<12}{'ORM + jsonable_encoder':>24}{'colunas + validação':>22}{'ganho':>8}")
+
+    for name, entities, projected, model in cases:
+        dumps = partial(serialization.dumps_validated, List[model])
+        assert json.loads(legacy_dumps(entities)) == json.loads(dumps(projected)), name
+
+        t_before = per_row_us(legacy_dumps, entities, rows, repeat)
+        t_after = per_row_us(dumps, projected, rows, repeat)
+        print(f"{name:<12}{t_before:>24.2f}{t_after:>22.2f}{t_before / t_after:>7.1f}x")
+
+
+def bench_database(rows, repeat):
+    from backend.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        def fetch_entities(_):
+            db.expunge_all()
+            page = db.query(models.Operadora).order_by(models.Operadora.registro_ans).limit(rows).all()
+            return legacy_dumps({"data": page})
+
+        def fetch_columns(_):
+            page = (
+                db.query(*schemas.columns(models.Operadora, schemas.Operadora))
+                .order_by(models.Operadora.registro_ans).limit(rows).all()
+            )
+            return serialization.dumps({"data": [row._asdict() for row in page]})
+
+        fetched = len(db.query(models.Operadora.registro_ans).limit(rows).all())
+        if not fetched:
+            print("\n[AVISO] Tabela operadoras vazia: medição no banco ignorada.")
+            return
+
+        t_before = per_row_us(fetch_entities, None, fetched, repeat)
+        t_after = per_row_us(fetch_columns, None, fetched, repeat)
+        print(f"\nLeitura + serialização de {fetched:,} operadoras do banco (µs por linha)")
+        print(f"{'entidades ORM':<24}{t_before:>10.2f}")
+        print(f"{'projeção de colunas':<24}{t_after:>10.2f}{t_before / t_after:>7.1f}x")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--db", action="store_true", help="mede também a leitura no banco de DATABASE_URL")
+    args = parser.parse_args()
+
+    print(f"JSON: {'orjson' if serialization.orjson else 'json (orjson não instalado)'}\n")
+    bench_serialization(args.rows, args.repeat)
+    if args.db:
+        bench_database(args.rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Gerador de dados sintéticos no formato dos arquivos da ANS.
+
+Grava em `<destino>/data/raw` os ZIPs trimestrais de Demonstrações Contábeis
+e um `Relatorio_Cadop.csv` correspondente, permitindo rodar e medir o
+pipeline sem acesso ao site da ANS. Os arquivos reproduzem o que o
+processamento precisa tratar nos dados reais:
+
+- as variações de nome de coluna previstas em `COLUMN_MAP`;
+- contas contábeis misturadas, com a descrição de despesas em grafias diferentes;
+- valores com vírgula decimal, zerados e negativos;
+- arquivos em latin1 e utf-8 alternados;
+- operadoras ausentes do CADOP e CNPJs incompletos.
+
+A geração é feita em blocos e o CSV é escrito em fluxo dentro do ZIP,
+então a memória não cresce com `--rows` (testado de 10 mil a 50 milhões).
+Com a mesma semente, os arquivos gerados são idênticos.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.synthetic_data --rows 1000000 --output /tmp/ans_sintetico
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+GENERATION_CHUNK_ROWS = 500_000
+
+COLUMN_VARIANTS = [
+    ["DATA", "REG_ANS", "CD_CONTA_CONTABIL", "DESCRICAO", "VL_SALDO_INICIAL", "VL_SALDO_FINAL"],
+    ["DT_CMPTC", "CD_OPERADORA", "CD_CONTA_CONTABIL", "DS_CONTA", "VL_SALDO_INICIAL", "VL_SALDO_FINAL"],
+    ["DATA", "RegistroANS", "CD_CONTA_CONTABIL", "DESCRICAO", "VL_SALDO_INICIAL", "VL_SALDO_FINAL"],
+]
+ENCODINGS = ["latin1", "utf-8"]
+
+# (código, descrição, peso). As três primeiras passam no filtro de despesas.
+ACCOUNTS = [
+    ("41", "Despesas com Eventos / Sinistros", 0.12),
+    ("41", "DESPESAS COM EVENTOS/SINISTROS", 0.06),
+    ("41", "Despesas com  Eventos / Sinistros ", 0.04),
+    ("411", "Eventos/Sinistros Conhecidos ou Avisados de Assistência a Saúde Médico Hospitalar", 0.18),
+    ("311", "Contraprestações Efetivas de Plano de Assistência à Saúde", 0.20),
+    ("46", "Despesas Administrativas", 0.15),
+    ("21", "Provisões Técnicas de Operações de Assistência à Saúde", 0.15),
+    ("12", "Aplicações Financeiras", 0.10),
+]
+
+CADOP_COLUMNS = [
+    "REGISTRO_OPERADORA", "CNPJ", "Razao_Social", "Nome_Fantasia", "Modalidade",
+    "Logradouro", "Numero", "Bairro", "Cidade", "UF", "CEP", "Data_Registro_ANS",
+]
+MODALIDADES = [
+    "Medicina de Grupo", "Cooperativa Médica", "Autogestão", "Odontologia de Grupo",
+    "Cooperativa Odontológica", "Seguradora Especializada em Saúde", "Filantropia",
+]
+UFS = ["SP", "RJ", "MG", "RS", "PR", "SC", "BA", "PE", "CE", "GO", "DF", "ES", "PA", "AM", "MT"]
+
+FIRST_REG_ANS = 300_000
+
+
+def quarters(count, last=(2025, 3)):
+    """Os `count` trimestres mais recentes até `last`, do mais novo para o mais antigo."""
+    ano, trimestre = last
+    result = []
+    for _ in range(count):
+        result.append((ano, trimestre))
+        ano, trimestre = (ano, trimestre - 1) if trimestre > 1 else (ano - 1, 4)
+    return result
+
+
+def _accounts_chunk(rng, rows, operators, ano, trimestre):
+    weights = np.array([w for _, _, w in ACCOUNTS])
+    account = rng.choice(len(ACCOUNTS), size=rows, p=weights / weights.sum())
+
+    # Cerca de 3% zerados e 5% negativos, que o processamento descarta
+    cents = rng.integers(1, 5_000_000_000, size=rows)
+    cents[rng.random(rows) < 0.03] = 0
+    cents[rng.random(rows) < 0.05] *= -1
+
+    return pd.DataFrame({
+        "data": f"{ano}-{(trimestre - 1) * 3 + 1:02d}-01",
+        "reg": FIRST_REG_ANS + rng.integers(0, operators, size=rows),
+        "conta": np.array([code for code, _, _ in ACCOUNTS])[account],
+        "descricao": np.array([name for _, name, _ in ACCOUNTS])[account],
+        "inicial": rng.integers(0, 5_000_000_000, size=rows) / 100,
+        "final": cents / 100,
+    })
+
+
+def write_quarter(path, rows, operators, ano, trimestre, columns, encoding, rng):
+    """Grava um ZIP trimestral com um único CSV, gerado e comprimido em blocos."""
+    member = f"{trimestre}T{ano}.csv"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        with zf.open(member, "w", force_zip64=True) as fh:
+            fh.write((";".join(f'"{c}"' for c in columns) + "\n").encode(encoding))
+            for start in range(0, rows, GENERATION_CHUNK_ROWS):
+                df = _accounts_chunk(rng, min(GENERATION_CHUNK_ROWS, rows - start), operators, ano, trimestre)
+                text = df.to_csv(
+                    sep=";", decimal=",", float_format="%.2f", header=False, index=False,
+                    quoting=csv.QUOTE_ALL, lineterminator="\n",
+                )
+                fh.write(text.encode(encoding))
+
+
+def write_cadop(path, operators, rng, encoding="utf-8", coverage=0.9):
+    """
+    Grava o CADOP com uma parte das operadoras dos trimestres (`coverage`),
+    para que o cruzamento também gere cadastros provisórios.
+    """
+    regs = np.arange(FIRST_REG_ANS, FIRST_REG_ANS + operators)
+    regs = regs[rng.random(operators) < coverage]
+    count = len(regs)
+
+    cnpj = pd.Series(rng.integers(10**12, 10**14, size=count)).astype(str).str.zfill(14)
+    short = rng.random(count) < 0.02
+    cnpj[short] = cnpj[short].str[:11]
+
+    df = pd.DataFrame({
+        "REGISTRO_OPERADORA": regs,
+        "CNPJ": cnpj,
+        "Razao_Social": [f"OPERADORA DE SAÚDE {reg} LTDA" for reg in regs],
+        "Nome_Fantasia": [f"SAÚDE {reg}" for reg in regs],
+        "Modalidade": np.array(MODALIDADES)[rng.integers(0, len(MODALIDADES), size=count)],
+        "Logradouro": "RUA DAS PALMEIRAS",
+        "Numero": rng.integers(1, 3000, size=count),
+        "Bairro": "CENTRO",
+        "Cidade": "SÃO PAULO",
+        "UF": np.array(UFS)[rng.integers(0, len(UFS), size=count)],
+        "CEP": pd.Series(rng.integers(1_000_000, 99_999_999, size=count)).astype(str).str.zfill(8),
+        "Data_Registro_ANS": "1999-01-01",
+    })[CADOP_COLUMNS]
+
+    df.to_csv(path, sep=";", index=False, encoding=encoding, quoting=csv.QUOTE_ALL, lineterminator="\n")
+    return count
+
+
+def generate(output, rows, quarter_count=3, operators=1000, seed=42, cadop_encoding="utf-8"):
+    """
+    Gera `rows` linhas contábeis divididas entre `quarter_count` trimestres,
+    mais o CADOP, em `<output>/data/raw`. Retorna a descrição da base gerada,
+    também gravada em `<output>/synthetic.json`.
+    """
+    rng = np.random.default_rng(seed)
+    raw_dir = os.path.join(output, "data", "raw")
+    os.makedirs(raw_dir, exist_ok=True)
+
+    files = []
+    per_quarter = [rows // quarter_count + (1 if i < rows % quarter_count else 0) for i in range(quarter_count)]
+    for i, ((ano, trimestre), quarter_rows) in enumerate(zip(quarters(quarter_count), per_quarter)):
+        columns = COLUMN_VARIANTS[i % len(COLUMN_VARIANTS)]
+        encoding = ENCODINGS[i % len(ENCODINGS)]
+        path = os.path.join(raw_dir, f"{trimestre}T{ano}.zip")
+
+        start = time.perf_counter()
+        write_quarter(path, quarter_rows, operators, ano, trimestre, columns, encoding, rng)
+        print(f"[OK] {os.path.basename(path)}: {quarter_rows:,} linhas ({encoding}) em {time.perf_counter() - start:.1f}s")
+        files.append({"path": path, "rows": quarter_rows, "columns": columns, "encoding": encoding})
+
+    cadop_rows = write_cadop(os.path.join(raw_dir, "Relatorio_Cadop.csv"), operators, rng, cadop_encoding)
+    print(f"[OK] Relatorio_Cadop.csv: {cadop_rows:,} operadoras")
+
+    spec = {
+        "rows": rows, "quarters": quarter_count, "operators": operators, "seed": seed,
+        "cadop_encoding": cadop_encoding, "cadop_rows": cadop_rows, "files": files,
+    }
+    with open(os.path.join(output, "synthetic.json"), "w", encoding="utf-8") as f:
+        json.dump(spec, f, indent=2, ensure_ascii=False)
+    return spec
+
+
+def load_spec(output):
+    """Descrição da base sintética já gerada em `output`, ou None."""
+    path = os.path.join(output, "synthetic.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100_000, help="linhas contábeis no total (10 mil a 50 milhões)")
+    parser.add_argument("--quarters", type=int, default=3)
+    parser.add_argument("--operators", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cadop-encoding", default="utf-8", choices=ENCODINGS)
+    parser.add_argument("--output", required=True, help="diretório de destino (os arquivos vão para <output>/data/raw)")
+    args = parser.parse_args()
+
+    generate(args.output, args.rows, args.quarters, args.operators, args.seed, args.cadop_encoding)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,10 @@
 import pandas as pd
 import os
+import io
+import sys
+import time
+from processing import csv_reader, intermediate, normalizers
+import instrumentation
 
 BASE_DIR = "data"
 RAW_DIR = os.path.join(BASE_DIR, "raw")
@@ -10,10 +15,54 @@ FILE_CONSOLIDADO = os.path.join(PROCESSED_DIR, "consolidado_despesas.csv")
 FILE_AGREGADO = os.path.join(PROCESSED_DIR, "despesas_agregadas.csv")
 OUTPUT_SQL = "inserts.sql"
 
+CADOP_COLUMNS = ['REGISTRO_OPERADORA', 'CNPJ', 'Razao_Social', 'Modalidade', 'UF']
+
+COPY_CHUNK_ROWS = 100_000
+
+SNAPSHOT_DIR = os.path.join(PROCESSED_DIR, "ultima_carga")
+
+# Sinaliza para a API que os dados mudaram (invalidação de caches).
+BUMP_VERSION_SQL = """
+INSERT INTO versao_dados (id, versao, atualizado_em) VALUES (1, 1, now())
+ON CONFLICT (id) DO UPDATE SET versao = versao_dados.versao + 1, atualizado_em = now()
+"""
+PLACEHOLDER_PREFIXES = ("Operadora Histórica", "Operadora Agregada")
+# Visões materializadas de sql/create_tables.sql, atualizadas ao final de cada carga
+ANALYTICS_VIEWS = ("mv_crescimento_despesas", "mv_despesas_uf", "mv_operadoras_acima_media")
+
+# Passos finais do inserts.sql. Como no modo --copy, um banco sem as migrações
+# 002/005 só recebe um aviso em vez de interromper o script no fim da carga.
+FINALIZE_SQL = """
+DO $$
+DECLARE
+    visao text;
+BEGIN
+    FOREACH visao IN ARRAY ARRAY[{views}] LOOP
+        IF to_regclass(visao) IS NULL THEN
+            RAISE NOTICE 'Visão % não encontrada: rode sql/migrations/005_visoes_analiticas.sql.', visao;
+        ELSE
+            EXECUTE format('REFRESH MATERIALIZED VIEW CONCURRENTLY %I', visao);
+        END IF;
+    END LOOP;
+
+    IF to_regclass('versao_dados') IS NULL THEN
+        RAISE NOTICE 'Tabela versao_dados não encontrada: rode sql/migrations/002_versao_dados.sql.';
+    ELSE
+{bump};
+    END IF;
+END
+$$;
+""".format(
+    views=", ".join(f"'{view}'" for view in ANALYTICS_VIEWS),
+    bump="\n".join("        " + line for line in BUMP_VERSION_SQL.strip().splitlines()),
+)
+
 
 def clean_decimal(val):
     if pd.isna(val) or str(val).strip() == '':
         return 'NULL'
+    if isinstance(val, (int, float)):
+        return f"{val:.2f}"
     return str(val).replace('.', '').replace(',', '.')
 
 
@@ -42,64 +91,381 @@ def run():
         f.write("-- Script de Carga de Dados\n")
 
         print("[INFO] Processando Operadoras...")
-        try:
-            cadop = pd.read_csv(FILE_CADOP, sep=';', encoding='utf-8', dtype=str, on_bad_lines='skip')
-        except:
-            cadop = pd.read_csv(FILE_CADOP, sep=';', encoding='latin1', dtype=str, on_bad_lines='skip')
-
-        for _, row in cadop.iterrows():
-            reg = row.get('REGISTRO_OPERADORA', '0')
-            registered_ops.add(str(reg))
-
-            cnpj = row.get('CNPJ', '')
-            razao = clean_str(row.get('Razao_Social'))
-            mod = clean_str(row.get('Modalidade'))
-            uf = clean_uf(row.get('UF'))
-            
-            f.write(f"INSERT INTO operadoras (registro_ans, cnpj, razao_social, modalidade, uf) VALUES ({reg}, '{cnpj}', {razao}, {mod}, {uf}) ON CONFLICT (registro_ans) DO NOTHING;\n")
+        with instrumentation.step("sql.operadoras", bytes_read=instrumentation.file_size(FILE_CADOP)) as metrics:
+            start = f.tell()
+            cadop = csv_reader.read_csv(FILE_CADOP, usecols=CADOP_COLUMNS, on_bad_lines='skip')
+
+            for _, row in cadop.iterrows():
+                reg = row.get('REGISTRO_OPERADORA', '0')
+                registered_ops.add(str(reg))
+
+                cnpj = row.get('CNPJ', '')
+                razao = clean_str(row.get('Razao_Social'))
+                mod = clean_str(row.get('Modalidade'))
+                uf = clean_uf(row.get('UF'))
+
+                f.write(f"INSERT INTO operadoras (registro_ans, cnpj, razao_social, modalidade, uf) VALUES ({reg}, '{cnpj}', {razao}, {mod}, {uf}) ON CONFLICT (registro_ans) DO NOTHING;\n")
+
+            metrics.update(rows_in=len(cadop), rows_out=len(cadop), bytes_written=f.tell() - start)
 
         print("[INFO] Processando Demonstrações Contábeis...")
-        consol = pd.read_csv(FILE_CONSOLIDADO, sep=';', encoding='utf-8', dtype=str)
-        
-        for _, row in consol.iterrows():
-            try:
-                reg_ans = str(row['RazaoSocial']).split(' ')[-1]
-            except:
-                continue
-
-            if reg_ans not in registered_ops:
-                dummy_razao = f"'Operadora Histórica {reg_ans}'"
-                f.write(f"INSERT INTO operadoras (registro_ans, cnpj, razao_social, modalidade, uf) VALUES ({reg_ans}, NULL, {dummy_razao}, 'Desconhecida', NULL) ON CONFLICT (registro_ans) DO NOTHING;\n")
-                registered_ops.add(reg_ans)
-
-            ano = row['Ano']
-            trim = row['Trimestre']
-            val = clean_decimal(row['ValorDespesas'])
-            
-            if val != 'NULL':
-                f.write(f"INSERT INTO demonstracoes_contabeis (registro_ans, ano, trimestre, valor_despesa) VALUES ({reg_ans}, {ano}, {trim}, {val});\n")
+        with instrumentation.step("sql.demonstracoes") as metrics:
+            start = f.tell()
+            statements = 0
+            consol = intermediate.read_consolidado(FILE_CONSOLIDADO)
+            if consol is not None:
+                consol['REG_ANS'] = consol['REG_ANS'].astype(str)
+            else:
+                consol = csv_reader.read_csv(FILE_CONSOLIDADO)
+                consol['REG_ANS'] = normalizers.reg_ans_from_razao(consol['RazaoSocial'])
+
+            for _, row in consol.iterrows():
+                reg_ans = row['REG_ANS']
+
+                if reg_ans not in registered_ops:
+                    dummy_razao = f"'Operadora Histórica {reg_ans}'"
+                    f.write(f"INSERT INTO operadoras (registro_ans, cnpj, razao_social, modalidade, uf) VALUES ({reg_ans}, NULL, {dummy_razao}, 'Desconhecida', NULL) ON CONFLICT (registro_ans) DO NOTHING;\n")
+                    registered_ops.add(reg_ans)
+                    statements += 1
+
+                ano = row['Ano']
+                trim = row['Trimestre']
+                val = clean_decimal(row['ValorDespesas'])
+
+                if val != 'NULL':
+                    f.write(f"INSERT INTO demonstracoes_contabeis (registro_ans, ano, trimestre, valor_despesa) VALUES ({reg_ans}, {ano}, {trim}, {val}) ON CONFLICT (registro_ans, ano, trimestre) DO UPDATE SET valor_despesa = EXCLUDED.valor_despesa;\n")
+                    statements += 1
+
+            metrics.update(rows_in=len(consol), rows_out=statements, bytes_written=f.tell() - start)
 
         print("[INFO] Processando Dados Agregados...")
-        agreg = pd.read_csv(FILE_AGREGADO, sep=';', encoding='utf-8', dtype=str)
-        
-        for _, row in agreg.iterrows():
-            reg = row['RegistroANS']
-
-            if str(reg) not in registered_ops:
-                dummy_razao = f"'Operadora Agregada {reg}'"
-                f.write(f"INSERT INTO operadoras (registro_ans, cnpj, razao_social, modalidade, uf) VALUES ({reg}, NULL, {dummy_razao}, 'Desconhecida', NULL) ON CONFLICT (registro_ans) DO NOTHING;\n")
-                registered_ops.add(str(reg))
+        with instrumentation.step("sql.agregadas") as metrics:
+            start = f.tell()
+            statements = 0
+            agreg = intermediate.read_agregado(FILE_AGREGADO)
+            if agreg is None:
+                agreg = csv_reader.read_csv(FILE_AGREGADO)
+
+            for _, row in agreg.iterrows():
+                reg = row['RegistroANS']
 
-            razao = clean_str(row['RazaoSocial'])
-            uf = clean_uf(row['UF'])
-            total = clean_decimal(row['Total_Despesas'])
-            media = clean_decimal(row['Media_Trimestral'])
-            std = clean_decimal(row['Desvio_Padrao'])
-            
-            f.write(f"INSERT INTO despesas_agregadas (registro_ans, razao_social, uf, total_despesas, media_trimestral, desvio_padrao) VALUES ({reg}, {razao}, {uf}, {total}, {media}, {std}) ON CONFLICT (registro_ans) DO NOTHING;\n")
+                if str(reg) not in registered_ops:
+                    dummy_razao = f"'Operadora Agregada {reg}'"
+                    f.write(f"INSERT INTO operadoras (registro_ans, cnpj, razao_social, modalidade, uf) VALUES ({reg}, NULL, {dummy_razao}, 'Desconhecida', NULL) ON CONFLICT (registro_ans) DO NOTHING;\n")
+                    registered_ops.add(str(reg))
+                    statements += 1
+
+                razao = clean_str(row['RazaoSocial'])
+                uf = clean_uf(row['UF'])
+                total = clean_decimal(row['Total_Despesas'])
+                media = clean_decimal(row['Media_Trimestral'])
+                std = clean_decimal(row['Desvio_Padrao'])
+
+                f.write(f"INSERT INTO despesas_agregadas (registro_ans, razao_social, uf, total_despesas, media_trimestral, desvio_padrao) VALUES ({reg}, {razao}, {uf}, {total}, {media}, {std}) ON CONFLICT (registro_ans) DO NOTHING;\n")
+                statements += 1
+
+            metrics.update(rows_in=len(agreg), rows_out=statements, bytes_written=f.tell() - start)
+
+        f.write(FINALIZE_SQL.lstrip())
 
     print(f"[SUCESSO] Arquivo {OUTPUT_SQL} gerado com sucesso.")
     print(">>> Processo finalizado <<<")
 
+
+def _text_column(series):
+    """Versão vetorizada de `clean_str`/`clean_uf`: texto sem espaços ou None."""
+    text = series.astype("string").str.strip()
+    return text.where(text.notna() & (text != ""), None)
+
+
+def _decimal_column(series):
+    """Versão vetorizada de `clean_decimal`, devolvendo números em vez de SQL."""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+    text = series.astype("string").str.strip()
+    text = text.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+    return pd.to_numeric(text, errors='coerce')
+
+
+def load_frames():
+    """
+    Lê CADOP, consolidado e agregado e devolve três DataFrames tipados,
+    já no formato das tabelas operadoras, demonstracoes_contabeis
+    e despesas_agregadas (incluindo os cadastros provisórios).
+    """
+    cadop = csv_reader.read_csv(FILE_CADOP, usecols=CADOP_COLUMNS, on_bad_lines='skip')
+
+    uf = _text_column(cadop['UF'])
+    operadoras = pd.DataFrame({
+        'registro_ans': pd.to_numeric(cadop['REGISTRO_OPERADORA'], errors='coerce').astype('Int64'),
+        'cnpj': _text_column(cadop['CNPJ']),
+        'razao_social': _text_column(cadop['Razao_Social']),
+        'modalidade': _text_column(cadop['Modalidade']),
+        'uf': uf.where(uf.str.len() <= 2, None),
+    }).dropna(subset=['registro_ans'])
+
+    consol = intermediate.read_consolidado(FILE_CONSOLIDADO)
+    if consol is None:
+        consol = csv_reader.read_csv(FILE_CONSOLIDADO)
+        consol['REG_ANS'] = normalizers.reg_ans_from_razao(consol['RazaoSocial'])
+
+    demonstracoes = pd.DataFrame({
+        'registro_ans': pd.to_numeric(consol['REG_ANS'], errors='coerce').astype('Int64'),
+        'ano': pd.to_numeric(consol['Ano']).astype('Int64'),
+        'trimestre': pd.to_numeric(consol['Trimestre']).astype('Int64'),
+        'valor_despesa': _decimal_column(consol['ValorDespesas']),
+    }).dropna(subset=['registro_ans', 'valor_despesa'])
+
+    agreg = intermediate.read_agregado(FILE_AGREGADO)
+    if agreg is None:
+        agreg = csv_reader.read_csv(FILE_AGREGADO)
+
+    uf = _text_column(agreg['UF'])
+    agregadas = pd.DataFrame({
+        'registro_ans': pd.to_numeric(agreg['RegistroANS'], errors='coerce').astype('Int64'),
+        'razao_social': _text_column(agreg['RazaoSocial']),
+        'uf': uf.where(uf.str.len() <= 2, None),
+        'total_despesas': _decimal_column(agreg['Total_Despesas']),
+        'media_trimestral': _decimal_column(agreg['Media_Trimestral']),
+        'desvio_padrao': _decimal_column(agreg['Desvio_Padrao']),
+    }).dropna(subset=['registro_ans'])
+
+    placeholders = []
+    known = set(operadoras['registro_ans'])
+    for regs, label in ((demonstracoes['registro_ans'], 'Operadora Histórica'),
+                        (agregadas['registro_ans'], 'Operadora Agregada')):
+        missing = pd.Series(sorted(set(regs) - known), dtype='Int64')
+        known |= set(missing)
+        placeholders.append(pd.DataFrame({
+            'registro_ans': missing,
+            'cnpj': None,
+            'razao_social': label + ' ' + missing.astype(str),
+            'modalidade': 'Desconhecida',
+            'uf': None,
+        }))
+
+    operadoras = pd.concat([operadoras, *placeholders], ignore_index=True)
+    return operadoras, demonstracoes, agregadas
+
+
+def copy_frame(cursor, df, table, chunk_rows=COPY_CHUNK_ROWS):
+    """
+    Envia o DataFrame para a tabela via COPY FROM STDIN, em blocos de `chunk_rows` linhas.
+    Retorna os bytes enviados.
+    """
+    columns = ', '.join(df.columns)
+    sent = 0
+    for start in range(0, len(df), chunk_rows):
+        text = df.iloc[start:start + chunk_rows].to_csv(index=False, header=False, float_format='%.2f')
+        data = text.encode('utf-8')
+        cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", io.BytesIO(data))
+        sent += len(data)
+    return sent
+
+
+STAGING_SQL = """
+CREATE TEMP TABLE stg_operadoras (
+    registro_ans INT, cnpj VARCHAR(20), razao_social VARCHAR(255), modalidade VARCHAR(100), uf CHAR(2)
+) ON COMMIT DROP;
+CREATE TEMP TABLE stg_demonstracoes (
+    registro_ans INT, ano INT, trimestre INT, valor_despesa NUMERIC(18,2)
+) ON COMMIT DROP;
+CREATE TEMP TABLE stg_agregadas (
+    registro_ans INT, razao_social VARCHAR(255), uf CHAR(2),
+    total_despesas NUMERIC(18,2), media_trimestral NUMERIC(18,2), desvio_padrao NUMERIC(18,2)
+) ON COMMIT DROP;
+"""
+
+MERGE_SQL = {
+    "operadoras": """
+        INSERT INTO operadoras (registro_ans, cnpj, razao_social, modalidade, uf)
+        SELECT DISTINCT ON (registro_ans) registro_ans, cnpj, razao_social, modalidade, uf
+        FROM stg_operadoras
+        ORDER BY registro_ans
+        ON CONFLICT (registro_ans) DO NOTHING
+    """,
+    "demonstracoes_contabeis": """
+        INSERT INTO demonstracoes_contabeis (registro_ans, ano, trimestre, valor_despesa)
+        SELECT DISTINCT ON (registro_ans, ano, trimestre) registro_ans, ano, trimestre, valor_despesa
+        FROM stg_demonstracoes
+        ORDER BY registro_ans, ano, trimestre
+        ON CONFLICT (registro_ans, ano, trimestre) DO UPDATE
+        SET valor_despesa = EXCLUDED.valor_despesa
+        WHERE demonstracoes_contabeis.valor_despesa IS DISTINCT FROM EXCLUDED.valor_despesa
+    """,
+    "despesas_agregadas": """
+        INSERT INTO despesas_agregadas (registro_ans, razao_social, uf, total_despesas, media_trimestral, desvio_padrao)
+        SELECT DISTINCT ON (registro_ans) registro_ans, razao_social, uf, total_despesas, media_trimestral, desvio_padrao
+        FROM stg_agregadas
+        ORDER BY registro_ans
+        ON CONFLICT (registro_ans) DO NOTHING
+    """,
+}
+
+
+_NOT_PLACEHOLDER = " AND ".join(
+    f"COALESCE(EXCLUDED.razao_social, '') NOT LIKE '{prefix} %'" for prefix in PLACEHOLDER_PREFIXES
+)
+
+# No modo delta, cadastros reais do CADOP substituem os provisórios
+# ("Operadora Histórica"/"Operadora Agregada"), mas nunca o contrário.
+UPSERT_SQL = {
+    **MERGE_SQL,
+    "operadoras": f"""
+        INSERT INTO operadoras (registro_ans, cnpj, razao_social, modalidade, uf)
+        SELECT DISTINCT ON (registro_ans) registro_ans, cnpj, razao_social, modalidade, uf
+        FROM stg_operadoras
+        ORDER BY registro_ans
+        ON CONFLICT (registro_ans) DO UPDATE
+        SET cnpj = EXCLUDED.cnpj,
+            razao_social = EXCLUDED.razao_social,
+            modalidade = EXCLUDED.modalidade,
+            uf = EXCLUDED.uf
+        WHERE {_NOT_PLACEHOLDER}
+          AND (operadoras.cnpj, operadoras.razao_social, operadoras.modalidade, operadoras.uf)
+              IS DISTINCT FROM (EXCLUDED.cnpj, EXCLUDED.razao_social, EXCLUDED.modalidade, EXCLUDED.uf)
+    """,
+    "despesas_agregadas": """
+        INSERT INTO despesas_agregadas (registro_ans, razao_social, uf, total_despesas, media_trimestral, desvio_padrao)
+        SELECT DISTINCT ON (registro_ans) registro_ans, razao_social, uf, total_despesas, media_trimestral, desvio_padrao
+        FROM stg_agregadas
+        ORDER BY registro_ans
+        ON CONFLICT (registro_ans) DO UPDATE
+        SET razao_social = EXCLUDED.razao_social,
+            uf = EXCLUDED.uf,
+            total_despesas = EXCLUDED.total_despesas,
+            media_trimestral = EXCLUDED.media_trimestral,
+            desvio_padrao = EXCLUDED.desvio_padrao
+        WHERE (despesas_agregadas.razao_social, despesas_agregadas.uf, despesas_agregadas.total_despesas,
+               despesas_agregadas.media_trimestral, despesas_agregadas.desvio_padrao)
+              IS DISTINCT FROM (EXCLUDED.razao_social, EXCLUDED.uf, EXCLUDED.total_despesas,
+                                EXCLUDED.media_trimestral, EXCLUDED.desvio_padrao)
+    """,
+}
+
+
+def _snapshot_path(table):
+    return os.path.join(SNAPSHOT_DIR, table + (".parquet" if intermediate.enabled() else ".pkl"))
+
+
+def load_snapshot(table, like):
+    """Lê o que foi enviado ao banco na última carga, com os mesmos tipos de `like`."""
+    path = _snapshot_path(table)
+    if not os.path.exists(path):
+        return None
+    df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_pickle(path)
+    return df.astype(like.dtypes.to_dict())
+
+
+def save_snapshot(table, df):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    path = _snapshot_path(table)
+    if path.endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_pickle(path)
+
+
+def changed_rows(df, previous):
+    """Linhas de `df` novas ou diferentes em relação à carga anterior."""
+    if previous is None:
+        return df
+    merged = df.merge(previous.drop_duplicates(), how='left', indicator=True)
+    return df[(merged['_merge'] == 'left_only').to_numpy()]
+
+
+def refresh_analytics(cursor):
+    """
+    Atualiza as visões materializadas das queries analíticas.
+    Visões ausentes (banco sem a migração 005) são apenas avisadas.
+    """
+    cursor.execute("SELECT matviewname FROM pg_matviews WHERE matviewname = ANY(%s)", (list(ANALYTICS_VIEWS),))
+    existing = {row[0] for row in cursor.fetchall()}
+
+    for view in ANALYTICS_VIEWS:
+        if view not in existing:
+            print(f"[AVISO] Visão {view} não encontrada: rode sql/migrations/005_visoes_analiticas.sql.")
+            continue
+        start = time.perf_counter()
+        cursor.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}")
+        print(f"[INFO] {view} atualizada em {time.perf_counter() - start:.2f}s")
+
+
+def run_copy(delta=False):
+    """
+    Carrega os dados direto no PostgreSQL configurado em DATABASE_URL.
+
+    Os registros são enviados via COPY FROM STDIN para tabelas temporárias
+    e depois inseridos nas tabelas finais com INSERT ... SELECT, tudo em uma
+    única transação. Ao final, informa linhas/s de cada tabela.
+
+    Com `delta=True`, só as linhas novas ou alteradas desde a última carga
+    (registrada em data/processed/ultima_carga) são enviadas, e as tabelas
+    são atualizadas por upsert na chave natural.
+    """
+    from backend.database import engine
+
+    print(">>> Carga direta no banco via COPY" + (" (delta)" if delta else "") + " <<<")
+
+    print("[INFO] Preparando dados...")
+    with instrumentation.step("sql.prepare") as metrics:
+        operadoras, demonstracoes, agregadas = load_frames()
+        metrics["rows_out"] = len(operadoras) + len(demonstracoes) + len(agregadas)
+    frames = {
+        "operadoras": operadoras,
+        "demonstracoes_contabeis": demonstracoes,
+        "despesas_agregadas": agregadas,
+    }
+    staging = {
+        "operadoras": "stg_operadoras",
+        "demonstracoes_contabeis": "stg_demonstracoes",
+        "despesas_agregadas": "stg_agregadas",
+    }
+    merge_sql = UPSERT_SQL if delta else MERGE_SQL
+
+    steps = []
+    for table, df in frames.items():
+        if delta:
+            df = changed_rows(df, load_snapshot(table, df))
+        steps.append((table, staging[table], df))
+
+    conn = engine.raw_connection()
+    try:
+        with conn.cursor() as cursor:
+            # O limite de tempo por comando (DB_STATEMENT_TIMEOUT_MS) vale só para a API
+            cursor.execute("SET LOCAL statement_timeout = 0")
+            cursor.execute(STAGING_SQL)
+
+            for table, staging_table, df in steps:
+                with instrumentation.step("sql.copy", table=table, rows_in=len(df)) as metrics:
+                    metrics["bytes_written"] = copy_frame(cursor, df, staging_table)
+                    cursor.execute(merge_sql[table])
+                    metrics["rows_out"] = cursor.rowcount
+                elapsed = metrics["wall_s"]
+
+                rate = len(df) / elapsed if elapsed > 0 else 0.0
+                print(f"[INFO] {table}: {len(df)} linhas enviadas, {cursor.rowcount} gravadas em {elapsed:.2f}s ({rate:,.0f} linhas/s)")
+
+            with instrumentation.step("sql.refresh"):
+                refresh_analytics(cursor)
+            cursor.execute(BUMP_VERSION_SQL)
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    for table, df in frames.items():
+        save_snapshot(table, df)
+
+    print("[SUCESSO] Carga concluída.")
+    print(">>> Processo finalizado <<<")
+
+
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    if "--copy" in sys.argv[1:]:
+        run_copy(delta="--delta" in sys.argv[1:])
+    else:
+        run()
\ No newline at end of file
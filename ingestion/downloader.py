@@ -1,33 +1,61 @@
 import os
+import time
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from ingestion.manifest import Manifest
+import instrumentation
 
 BASE_URL = "https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/"
 OUTPUT_DIR = os.path.join("data", "raw")
 
 BASE_URL_CADOP = "https://dadosabertos.ans.gov.br/FTP/PDA/operadoras_de_plano_de_saude_ativas/"
 
-def get_soup(url):
+CHUNK_SIZE = int(os.getenv("ANS_DOWNLOAD_CHUNK_SIZE", 1024 * 1024))
+MAX_WORKERS = int(os.getenv("ANS_DOWNLOAD_WORKERS", 4))
+PART_SUFFIX = ".part"
+
+
+def create_session(pool_size=MAX_WORKERS):
+    """
+    Cria uma sessão HTTP com pool de conexões reutilizáveis e retentativas
+    automáticas para falhas transitórias do servidor.
+    """
+    session = requests.Session()
+    session.headers.update({'User-Agent': 'Mozilla/5.0'})
+
+    retry = Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def get_soup(url, session=None):
     """
     Faz a requisição HTTP e retorna o HTML parseado.
     Retorna None em caso de erro de acesso.
     """
+    http = session or requests
     try:
         headers = {'User-Agent': 'Mozilla/5.0'}
-        response = requests.get(url, headers=headers, timeout=30)
+        response = http.get(url, headers=headers, timeout=30)
         response.raise_for_status()
         return BeautifulSoup(response.text, 'html.parser')
     except Exception as e:
         print(f"[ERRO] Falha ao acessar {url}: {e}")
         return None
 
-def get_available_years():
+def get_available_years(session=None):
     """
     Retorna os anos disponíveis no diretório da ANS,
     ordenados do mais recente para o mais antigo.
     """
-    soup = get_soup(BASE_URL)
+    soup = get_soup(BASE_URL, session)
     if not soup:
         return []
     
@@ -39,12 +67,12 @@ def get_available_years():
     
     return sorted(years, reverse=True)
 
-def get_zips_from_year(year):
+def get_zips_from_year(year, session=None):
     """
     Retorna todos os arquivos .zip disponíveis para um ano específico.
     """
     year_url = urljoin(BASE_URL, f"{year}/")
-    soup = get_soup(year_url)
+    soup = get_soup(year_url, session)
     if not soup:
         return []
 
@@ -57,76 +85,261 @@ def get_zips_from_year(year):
     
     return sorted(zip_links, reverse=True)
 
-def download_file(url, filename=None):
+def stream_to_file(url, filepath, session=None, chunk_size=CHUNK_SIZE, headers=None, if_range=None, on_start=None):
     """
-    Baixa um arquivo ZIP em partes para evitar uso excessivo de memória.
+    Grava o conteúdo da URL em `<arquivo>.part` e só o renomeia ao final.
+
+    Uma parte já baixada é retomada com Range + If-Range, sendo `if_range`
+    o ETag ou Last-Modified da versão a que a parte pertence. Se o arquivo
+    tiver sido republicado, o servidor responde 200 e o download recomeça
+    do zero. Sem `if_range` não há como conferir a versão, e a parte é
+    descartada. `on_start(cabeçalhos)` é chamado sempre que o download
+    começa do zero, para que a versão da nova parte seja registrada.
+
+    Retorna `(bytes transferidos, cabeçalhos da resposta)`. Em requisições
+    condicionais respondidas com 304, os bytes são None e nada é gravado.
+    """
+    http = session or requests
+    part_path = filepath + PART_SUFFIX
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) and if_range else 0
+    request_headers = dict(headers or {})
+    if offset:
+        request_headers['Range'] = f"bytes={offset}-"
+        request_headers['If-Range'] = if_range
+
+    with http.get(url, stream=True, timeout=60, headers=request_headers) as r:
+        if r.status_code == 304:
+            return None, r.headers
+
+        if r.status_code == 416:
+            if offset and _range_total(r.headers.get('Content-Range')) == offset:
+                # A parte já estava completa (interrupção antes da renomeação).
+                os.replace(part_path, filepath)
+                return 0, r.headers
+
+            # A parte local não corresponde mais ao arquivo remoto: recomeça do zero.
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            return stream_to_file(url, filepath, session, chunk_size, headers, on_start=on_start)
+
+        r.raise_for_status()
+        if r.status_code != 206:
+            offset = 0
+            if on_start is not None:
+                on_start(r.headers)
+
+        # Com Content-Encoding o tamanho informado não corresponde aos bytes decodificados.
+        expected = None if r.headers.get('Content-Encoding') else r.headers.get('Content-Length')
+        written = 0
+        with open(part_path, 'ab' if offset else 'wb') as f:
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+                written += len(chunk)
+
+    if expected is not None and written != int(expected):
+        raise IOError(f"download incompleto ({written} de {expected} bytes)")
+
+    os.replace(part_path, filepath)
+    return written, r.headers
+
+def _range_total(content_range):
+    """Tamanho total do arquivo remoto em um Content-Range (`bytes */1234`), ou None."""
+    total = (content_range or '').rpartition('/')[2].strip()
+    return int(total) if total.isdigit() else None
+
+def _adopt_existing(url, filepath, session, manifest):
+    """
+    Registra no manifesto um arquivo baixado antes da existência dele.
+    Usa um HEAD para obter os validadores; se o tamanho remoto divergir
+    do local, retorna False para que o arquivo seja baixado novamente.
+    """
+    http = session or requests
+    r = http.head(url, timeout=30, allow_redirects=True)
+    r.raise_for_status()
+
+    remote_size = r.headers.get('Content-Length')
+    if remote_size is not None and int(remote_size) != os.path.getsize(filepath):
+        return False
+
+    manifest.record(url, filepath, r.headers)
+    return True
+
+def _download(url, filename=None, session=None, chunk_size=CHUNK_SIZE, manifest=None):
+    """
+    Baixa um arquivo para OUTPUT_DIR.
+    Retorna os bytes transferidos ou None em caso de falha.
+
+    Sem manifesto, arquivos já existentes são simplesmente ignorados.
+    Com manifesto, é feita uma requisição condicional (ETag/Last-Modified)
+    e o arquivo só é baixado de novo se tiver sido republicado.
     """
     if not filename:
         filename = url.split('/')[-1]
-        
-    filepath = os.path.join(OUTPUT_DIR, filename)
 
-    if os.path.exists(filepath):
-        print(f"[INFO] Arquivo já existe, pulando: {filename}")
-        return True
+    with instrumentation.step("ingestion.download", file=filename) as metrics:
+        written = _fetch(url, filename, session, chunk_size, manifest)
+        metrics["bytes_written"] = written or 0
+        metrics["failed"] = written is None
+    return written
+
+def _fetch(url, filename, session, chunk_size, manifest):
+    """Corpo de `_download`: verifica o manifesto e transfere o arquivo."""
+    filepath = os.path.join(OUTPUT_DIR, filename)
+    headers = {}
 
-    print(f"[BAIXANDO] {filename}...")
     try:
-        with requests.get(url, stream=True, timeout=60) as r:
-            r.raise_for_status()
-            with open(filepath, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    f.write(chunk)
-        print(f"[SUCESSO] Download concluído: {filename}")
-        return True
+        if os.path.exists(filepath):
+            if manifest is None:
+                print(f"[INFO] Arquivo já existe, pulando: {filename}")
+                return 0
+
+            if manifest.get(url) is None and _adopt_existing(url, filepath, session, manifest):
+                print(f"[INFO] Arquivo já existe, registrado no manifesto: {filename}")
+                return 0
+
+            headers = manifest.conditional_headers(url)
+            if os.path.exists(filepath + PART_SUFFIX):
+                # Uma parte antiga não pode ser combinada com uma nova versão do arquivo.
+                os.remove(filepath + PART_SUFFIX)
+
+        if headers:
+            print(f"[VERIFICANDO] {filename}...")
+        elif os.path.exists(filepath + PART_SUFFIX):
+            print(f"[RETOMANDO] {filename}...")
+        else:
+            print(f"[BAIXANDO] {filename}...")
+
+        if manifest is None:
+            if_range = on_start = None
+        else:
+            if_range = manifest.partial_validator(url)
+            on_start = partial(manifest.record_partial, url)
+        written, response_headers = stream_to_file(
+            url, filepath, session, chunk_size, headers, if_range=if_range, on_start=on_start,
+        )
+
+        if written is None:
+            manifest.touch(url)
+            print(f"[INFO] Sem alterações no servidor, pulando: {filename}")
+            return 0
+
+        if manifest is not None and not manifest.record(url, filepath, response_headers):
+            print(f"[INFO] Conteúdo idêntico ao já registrado: {filename}")
+        else:
+            print(f"[SUCESSO] Download concluído: {filename}")
+        return written
     except Exception as e:
+        # A parte já gravada é mantida para ser retomada na próxima execução.
         print(f"[ERRO] Falha ao baixar {filename}: {e}")
-        if os.path.exists(filepath):
-            os.remove(filepath)
-        return False
+        return None
+
+def download_file(url, filename=None, session=None, chunk_size=CHUNK_SIZE, manifest=None):
+    """
+    Baixa um arquivo ZIP em partes para evitar uso excessivo de memória.
+    """
+    return _download(url, filename, session, chunk_size, manifest) is not None
+
+def download_many(urls, workers=MAX_WORKERS, session=None, chunk_size=CHUNK_SIZE, manifest=None, on_done=None):
+    """
+    Baixa vários arquivos em paralelo com um pool limitado de threads,
+    compartilhando a mesma sessão HTTP. Retorna a quantidade de sucessos.
+
+    `on_done(caminho, bytes)` é chamado na thread do download assim que
+    cada arquivo termina (bytes é None em caso de falha).
+    """
+    session = session or create_session(workers)
+    start = time.perf_counter()
+
+    def fetch(url):
+        written = _download(url, session=session, chunk_size=chunk_size, manifest=manifest)
+        if on_done is not None:
+            on_done(os.path.join(OUTPUT_DIR, url.split('/')[-1]), written)
+        return written
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(fetch, urls))
+
+    elapsed = time.perf_counter() - start
+    ok = [r for r in results if r is not None]
+    total_bytes = sum(ok)
+    rate = total_bytes / elapsed if elapsed > 0 else 0.0
+
+    print(
+        f"[RESUMO] {len(ok)}/{len(urls)} arquivos, "
+        f"{total_bytes / 1024 ** 2:.1f} MB em {elapsed:.1f}s ({rate / 1024 ** 2:.2f} MB/s)"
+    )
+    return len(ok)
     
-def run_cadop_download():
+def run_cadop_download(session=None, manifest=None):
     """Baixa o arquivo de Cadastro de Operadoras (CADOP)."""
     
     print("[INFO] Buscando arquivo do CADOP...")
-    soup = get_soup(BASE_URL_CADOP)
+    soup = get_soup(BASE_URL_CADOP, session)
     if not soup: return
 
     for link in soup.find_all('a'):
         href = link.get('href', '')
         if href.lower().endswith('.csv'):
             file_url = urljoin(BASE_URL_CADOP, href)
-            download_file(file_url, "Relatorio_Cadop.csv") 
+            download_file(file_url, "Relatorio_Cadop.csv", session, manifest=manifest)
             return
 
-def run():
+def _candidate_zips(years, session=None):
+    """ZIPs disponíveis, do mais recente para o mais antigo, listando cada ano só quando necessário."""
+    for year in years:
+        print(f"[INFO] Verificando arquivos de {year}...")
+        yield from get_zips_from_year(year, session)
+
+def run(workers=MAX_WORKERS, on_done=None):
     """
     Executa o processo de ingestão,
     baixando os 3 arquivos mais recentes disponíveis.
+
+    Com `workers` > 1 os arquivos são baixados em paralelo;
+    com `workers` = 1 mantém o download sequencial.
+    `on_done(caminho, bytes)` é avisado a cada ZIP concluído (ver `download_many`).
+
+    O manifesto (data/raw/manifest.json) é atualizado ao final, permitindo
+    que as etapas seguintes consultem quais insumos mudaram.
     """
 
     print(">>> Iniciando ingestão de dados ANS")
 
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-    years = get_available_years()
+    session = create_session(max(workers, 1))
+    manifest = Manifest()
+    manifest.start_run()
+    years = get_available_years(session)
     downloads_count = 0
     target = 3
 
-    for year in years:
-        if downloads_count >= target:
-            break
-        
-        print(f"[INFO] Verificando arquivos de {year}...")
-        zips = get_zips_from_year(year)
+    candidates = _candidate_zips(years, session)
 
-        for zip_url in zips:
-            if downloads_count >= target:
+    if workers > 1:
+        # Cada rodada baixa só o que falta; falhas são substituídas pelos
+        # próximos candidatos, como no modo sequencial.
+        while downloads_count < target:
+            selected = list(islice(candidates, target - downloads_count))
+            if not selected:
                 break
-            if download_file(zip_url):
+            downloads_count += download_many(selected, workers, session, manifest=manifest, on_done=on_done)
+    else:
+        for zip_url in candidates:
+            written = _download(zip_url, session=session, manifest=manifest)
+            if on_done is not None:
+                on_done(os.path.join(OUTPUT_DIR, zip_url.split('/')[-1]), written)
+            if written is not None:
                 downloads_count += 1
+            if downloads_count >= target:
+                break
     
-    run_cadop_download()
+    run_cadop_download(session, manifest)
+    manifest.save()
+
+    changed = manifest.changed_since("ingestion")
+    manifest.mark_consumed("ingestion")
+    print(f"[INFO] {len(changed)} arquivo(s) novo(s) ou alterado(s) nesta execução.")
 
     if downloads_count == 0:
         print("[AVISO] Nenhum arquivo foi baixado. Verifique a conexão ou o site.")
@@ -0,0 +1,150 @@
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime, timezone
+
+MANIFEST_PATH = os.path.join("data", "raw", "manifest.json")
+
+
+def sha256_file(filepath, chunk_size=1024 * 1024):
+    """Calcula o SHA-256 de um arquivo lendo-o em blocos."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """
+    Registro local dos arquivos brutos baixados da ANS.
+
+    Para cada URL guarda ETag, Last-Modified, tamanho e SHA-256 do arquivo,
+    além da execução de ingestão em que o conteúdo mudou pela última vez.
+    As etapas seguintes consultam `changed_since(etapa)` para processar
+    apenas o que mudou desde a sua última execução.
+    """
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data = {"run": 0, "files": {}, "stages": {}, "partials": {}}
+
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.data.update(json.load(f))
+
+    @property
+    def run(self):
+        return self.data["run"]
+
+    def start_run(self):
+        """Inicia uma nova execução de ingestão."""
+        self.data["run"] += 1
+        return self.run
+
+    def get(self, url):
+        return self.data["files"].get(url)
+
+    def conditional_headers(self, url):
+        """Cabeçalhos para requisição condicional (resposta 304 se nada mudou)."""
+        entry = self.get(url) or {}
+        headers = {}
+        if entry.get("etag"):
+            headers['If-None-Match'] = entry["etag"]
+        if entry.get("last_modified"):
+            headers['If-Modified-Since'] = entry["last_modified"]
+        return headers
+
+    def record_partial(self, url, response_headers):
+        """
+        Guarda a versão (ETag/Last-Modified) de um download que começou do
+        zero, para que a parte gravada só seja retomada se o arquivo remoto
+        não tiver mudado. O manifesto é salvo na hora, pois o download
+        pode ser interrompido antes do fim da execução.
+        """
+        with self._lock:
+            self.data["partials"][url] = {
+                "etag": response_headers.get('ETag'),
+                "last_modified": response_headers.get('Last-Modified'),
+            }
+        self.save()
+
+    def partial_validator(self, url):
+        """
+        Valor do cabeçalho If-Range para retomar a parte de `url`, ou None
+        se a versão da parte for desconhecida. ETags fracas não valem em
+        If-Range, e nesse caso é usado o Last-Modified.
+        """
+        entry = self.data["partials"].get(url) or {}
+        etag = entry.get("etag")
+        if etag and not etag.startswith("W/"):
+            return etag
+        return entry.get("last_modified")
+
+    def record(self, url, filepath, response_headers=None):
+        """
+        Registra o arquivo baixado e indica se o conteúdo mudou
+        em relação à versão anterior (comparando o SHA-256).
+        """
+        response_headers = response_headers or {}
+        digest = sha256_file(filepath)
+
+        with self._lock:
+            previous = self.data["files"].get(url, {})
+            partial = self.data["partials"].pop(url, None) or {}
+            changed = previous.get("sha256") != digest
+
+            self.data["files"][url] = {
+                "path": filepath,
+                "etag": response_headers.get('ETag') or partial.get("etag") or previous.get("etag"),
+                "last_modified": (
+                    response_headers.get('Last-Modified') or partial.get("last_modified")
+                    or previous.get("last_modified")
+                ),
+                "content_length": os.path.getsize(filepath),
+                "sha256": digest,
+                "changed_run": self.run if changed else previous.get("changed_run", self.run),
+                "checked_at": _now(),
+            }
+        return changed
+
+    def touch(self, url):
+        """Marca o arquivo como verificado sem alterações (resposta 304)."""
+        with self._lock:
+            if url in self.data["files"]:
+                self.data["files"][url]["checked_at"] = _now()
+
+    def changed_since(self, stage):
+        """Caminhos dos arquivos que mudaram desde a última execução da etapa."""
+        last = self.data["stages"].get(stage, 0)
+        return sorted(
+            entry["path"]
+            for entry in self.data["files"].values()
+            if entry.get("changed_run", 0) > last and os.path.exists(entry["path"])
+        )
+
+    def mark_consumed(self, stage):
+        """Registra que a etapa processou tudo até a execução atual."""
+        with self._lock:
+            self.data["stages"][stage] = self.run
+        self.save()
+
+    def save(self):
+        """Grava o manifesto de forma atômica."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+
+def changed_since(stage, path=MANIFEST_PATH):
+    """Atalho para consultar os insumos alterados sem instanciar o manifesto."""
+    return Manifest(path).changed_since(stage)
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
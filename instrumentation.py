@@ -0,0 +1,140 @@
+"""
+Telemetria estruturada do pipeline.
+
+Etapas e sub-etapas são medidas com `step(nome)`, que gera um evento JSON
+com tempo de parede e de CPU, pico de RSS do processo e as contagens
+preenchidas pelo próprio código medido (`rows_in`, `rows_out`,
+`bytes_read`, `bytes_written`). Com um relatório aberto por `start_run`,
+os eventos são acrescentados, um por linha, em data/reports/run_<data>.jsonl;
+sem relatório, as medições são apenas descartadas.
+
+O caminho do relatório vai na variável ANS_RUN_REPORT, então os processos
+do pool de consolidação gravam no mesmo arquivo.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPORTS_DIR = os.path.join("data", "reports")
+REPORT_ENV = "ANS_RUN_REPORT"
+
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def report_path():
+    return os.environ.get(REPORT_ENV)
+
+
+def start_run(path=None):
+    """
+    Abre um relatório novo para os eventos desta execução e devolve o caminho.
+    Sem `path`, o nome vem da data; execuções iniciadas no mesmo segundo
+    recebem um sufixo (_2, _3...) em vez de apagar o relatório da outra.
+    """
+    if path is not None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        open(path, "w", encoding="utf-8").close()
+    else:
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        base = os.path.join(REPORTS_DIR, f"run_{datetime.now().strftime('%Y%m%dT%H%M%S')}")
+        path, attempt = base + ".jsonl", 1
+        while True:
+            try:
+                open(path, "x", encoding="utf-8").close()
+                break
+            except FileExistsError:
+                attempt += 1
+                path = f"{base}_{attempt}.jsonl"
+
+    os.environ[REPORT_ENV] = path
+    return path
+
+
+def end_run():
+    os.environ.pop(REPORT_ENV, None)
+
+
+def peak_rss_mb():
+    """Pico de memória residente do processo até agora, em MB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    return round(peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def _process_cpu():
+    """CPU do processo e dos processos filhos já finalizados (workers do pool)."""
+    cpu = time.process_time()
+    if resource is not None:
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu += children.ru_utime + children.ru_stime
+    return cpu
+
+
+def emit(event, **fields):
+    """Acrescenta um evento ao relatório aberto (sem relatório, não faz nada)."""
+    path = report_path()
+    if not path:
+        return
+
+    record = {
+        "event": event,
+        "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "pid": os.getpid(),
+        **fields,
+    }
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    with _lock:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+@contextmanager
+def step(name, process_cpu=False, **fields):
+    """
+    Mede o bloco e emite um evento `step` ao final, inclusive em caso de erro.
+
+    O dicionário devolvido recebe as contagens do bloco e, na saída,
+    `wall_s` e `cpu_s`. Por padrão a CPU é a da thread atual; com
+    `process_cpu=True` (etapas inteiras), a do processo e dos seus filhos.
+    """
+    stack = getattr(_local, "stack", None)
+    if stack is None or _local.pid != os.getpid():
+        # Processos do pool criados por fork herdam a pilha de quem os criou
+        stack = _local.stack = []
+        _local.pid = os.getpid()
+    parent = stack[-1] if stack else None
+    stack.append(name)
+
+    metrics = dict(fields)
+    cpu_clock = _process_cpu if process_cpu else time.thread_time
+    wall_start = time.perf_counter()
+    cpu_start = cpu_clock()
+    status = "ok"
+    try:
+        yield metrics
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        stack.pop()
+        metrics["wall_s"] = round(time.perf_counter() - wall_start, 4)
+        metrics["cpu_s"] = round(cpu_clock() - cpu_start, 4)
+        emit("step", step=name, parent=parent, status=status, peak_rss_mb=peak_rss_mb(), **metrics)
+
+
+def file_size(*paths):
+    """Soma dos tamanhos dos arquivos existentes."""
+    return sum(os.path.getsize(p) for p in paths if os.path.exists(p))
@@ -1,24 +1,43 @@
-from ingestion.downloader import run as run_ingestion
-from processing.data_processor import run as run_processing
-from processing.data_enrichment import run as run_enrichment
-from db_importer import run as run_sql_generation
+import argparse
+
+import pipeline
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Pipeline de dados da ANS: ingestion -> processing -> enrichment -> sql."
+    )
+    parser.add_argument("--stage", choices=pipeline.STAGE_NAMES, help="executa apenas esta etapa")
+    parser.add_argument("--from", dest="first", choices=pipeline.STAGE_NAMES, help="primeira etapa a executar")
+    parser.add_argument("--to", dest="last", choices=pipeline.STAGE_NAMES, help="última etapa a executar")
+    parser.add_argument("--force", action="store_true", help="executa as etapas mesmo sem alterações nas entradas")
+    parser.add_argument(
+        "--no-overlap", action="store_true",
+        help="só começa o processamento depois que toda a ingestão terminar",
+    )
+    parser.add_argument("--profile", action="store_true", help="anexa ao relatório o cProfile da etapa mais lenta")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="consolida só os ZIPs novos ou alterados e atualiza as agregadas pelo estado salvo",
+    )
+    args = parser.parse_args()
+
+    if args.stage and (args.first or args.last):
+        parser.error("--stage não pode ser combinado com --from/--to")
+    if args.stage:
+        args.first = args.last = args.stage
+    return args
+
 
 if __name__ == "__main__":
+    args = parse_args()
     try:
-        run_ingestion()
-        print("\n" + "="*30 + "\n")
-       
-        run_processing()
-        print("\n" + "="*30 + "\n")
-        
-        run_enrichment()
-        print("\n" + "="*30 + "\n")
-
-        run_sql_generation()
-        
+        pipeline.run(args.first, args.last, force=args.force, overlap=not args.no_overlap, profile=args.profile,
+                     incremental=args.incremental)
+
         print("\n--- PROCESSO FINALIZADO COM SUCESSO ---")
-        
+
     except KeyboardInterrupt:
         print("\n[!] Processo interrompido pelo usuário.")
     except Exception as e:
-        print(f"\n[ERRO FATAL] Ocorreu um erro inesperado: {e}")
\ No newline at end of file
+        print(f"\n[ERRO FATAL] Ocorreu um erro inesperado: {e}")
@@ -0,0 +1,351 @@
+"""
+Execução das etapas do pipeline com cache por impressão digital dos arquivos.
+
+Cada etapa declara os arquivos que lê e os que gera. Ao final de uma etapa,
+o SHA-256 de entradas e saídas é registrado em data/pipeline_state.json; na
+execução seguinte a etapa é pulada se as entradas forem as mesmas e as
+saídas continuarem intactas. A ingestão não tem entradas locais e sempre
+roda (o manifesto já evita baixar o que não mudou).
+
+Quando ingestão e processamento rodam juntos, cada ZIP trimestral começa a
+ser processado assim que o seu download termina, em vez de esperar o fim de
+toda a ingestão.
+"""
+
+import cProfile
+import glob
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+
+import db_importer
+import instrumentation
+from ingestion import downloader
+from ingestion.manifest import sha256_file
+from processing import data_enrichment, data_processor, incremental, intermediate
+
+STATE_PATH = os.path.join("data", "pipeline_state.json")
+PROFILE_TOP_FUNCTIONS = 30
+
+
+class Stage:
+    """Etapa do pipeline: função de execução e listas de arquivos lidos e gerados."""
+
+    def __init__(self, name, run, inputs=None, outputs=None):
+        self.name = name
+        self.run = run
+        self.inputs = inputs
+        self.outputs = outputs or (lambda: [])
+
+
+def _raw_zips():
+    return sorted(glob.glob(os.path.join(data_processor.RAW_DIR, "*.zip")))
+
+
+def _consolidado_files(with_zip=False):
+    # O ZIP de entrega não é lido por nenhuma etapa (e muda a cada gravação)
+    files = [data_processor.FINAL_CSV] + ([data_processor.FINAL_ZIP] if with_zip else [])
+    if intermediate.enabled():
+        files.append(intermediate.CONSOLIDADO_PARQUET)
+    return files
+
+
+def _agregado_files(with_zip=False):
+    files = [data_enrichment.OUTPUT_CSV] + ([data_enrichment.OUTPUT_ZIP] if with_zip else [])
+    if intermediate.enabled():
+        files.append(intermediate.AGREGADO_PARQUET)
+    return files
+
+
+STAGES = [
+    Stage(
+        "ingestion", downloader.run,
+        outputs=lambda: _raw_zips() + [data_enrichment.CADOP_CSV],
+    ),
+    Stage(
+        "processing", data_processor.run,
+        inputs=_raw_zips,
+        outputs=lambda: _consolidado_files(with_zip=True),
+    ),
+    Stage(
+        "enrichment", data_enrichment.run,
+        inputs=lambda: _consolidado_files() + [data_enrichment.CADOP_CSV],
+        outputs=lambda: _agregado_files(with_zip=True),
+    ),
+    Stage(
+        "sql", db_importer.run,
+        inputs=lambda: [db_importer.FILE_CADOP] + _consolidado_files() + _agregado_files(),
+        outputs=lambda: [db_importer.OUTPUT_SQL],
+    ),
+]
+
+# Com --incremental, a consolidação processa só os ZIPs novos ou alterados
+# (processing/incremental.py) e as agregadas saem do estado acumulado.
+INCREMENTAL_STAGES = [
+    STAGES[0],
+    Stage(
+        "processing", partial(incremental.run, aggregate=False),
+        inputs=_raw_zips,
+        outputs=lambda: [data_processor.FINAL_CSV, data_processor.FINAL_ZIP, incremental.CATALOG_PATH],
+    ),
+    Stage(
+        "enrichment", incremental.run_aggregation,
+        inputs=lambda: [incremental.CATALOG_PATH, data_enrichment.CADOP_CSV],
+        outputs=lambda: _agregado_files(with_zip=True),
+    ),
+    STAGES[3],
+]
+
+STAGE_NAMES = [stage.name for stage in STAGES]
+
+
+class PipelineState:
+    """
+    Impressões digitais registradas por etapa.
+
+    O SHA-256 de cada arquivo fica guardado junto com tamanho e mtime,
+    e só é recalculado quando um dos dois muda.
+    """
+
+    def __init__(self, path=STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data = {"files": {}, "stages": {}}
+
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.data.update(json.load(f))
+
+    def fingerprint(self, filepath):
+        """SHA-256 do arquivo, ou None se ele não existir."""
+        try:
+            stat = os.stat(filepath)
+        except FileNotFoundError:
+            return None
+
+        key = [stat.st_size, stat.st_mtime_ns]
+        with self._lock:
+            cached = self.data["files"].get(filepath)
+        if cached and cached[:2] == key:
+            return cached[2]
+
+        digest = sha256_file(filepath)
+        with self._lock:
+            self.data["files"][filepath] = key + [digest]
+        return digest
+
+    def snapshot(self, paths):
+        return {path: self.fingerprint(path) for path in paths}
+
+    def recorded_inputs(self, stage):
+        return self.data["stages"].get(stage.name, {}).get("inputs", {})
+
+    def is_fresh(self, stage):
+        """A etapa já rodou com as entradas atuais e as saídas continuam as mesmas."""
+        entry = self.data["stages"].get(stage.name)
+        if entry is None or stage.inputs is None:
+            return False
+
+        outputs = self.snapshot(stage.outputs())
+        return (
+            entry["inputs"] == self.snapshot(stage.inputs())
+            and entry["outputs"] == outputs
+            and None not in outputs.values()
+        )
+
+    def record(self, stage, elapsed):
+        """
+        Registra as impressões digitais após a execução da etapa.
+        Se alguma saída não foi gerada, o registro é descartado e a
+        etapa volta a rodar na próxima execução.
+        """
+        outputs = self.snapshot(stage.outputs())
+        if None in outputs.values():
+            self.data["stages"].pop(stage.name, None)
+            return False
+
+        self.data["stages"][stage.name] = {
+            "inputs": self.snapshot(stage.inputs()) if stage.inputs else {},
+            "outputs": outputs,
+            "elapsed": round(elapsed, 3),
+            "finished_at": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        }
+        return True
+
+    def save(self):
+        """Grava o estado de forma atômica."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+
+def _finish(stage, state, elapsed):
+    if state.record(stage, elapsed):
+        print(f"[INFO] Etapa {stage.name} concluída em {elapsed:.1f}s.")
+    else:
+        print(f"[AVISO] Etapa {stage.name} não gerou todas as saídas esperadas; será executada novamente.")
+    state.save()
+
+
+def _skip(stage):
+    print(f"[INFO] Etapa {stage.name}: entradas sem alterações, pulando.")
+    instrumentation.emit("skipped", step=stage.name)
+
+
+def _measured(name, func, profiles=None, **fields):
+    """
+    Executa `func` como uma etapa instrumentada e devolve as medições.
+    Com `profiles` (lista), a execução também roda sob cProfile e o
+    perfil é acrescentado à lista junto com o tempo de parede.
+    """
+    profiler = cProfile.Profile() if profiles is not None else None
+    with instrumentation.step(name, process_cpu=True, **fields) as metrics:
+        if profiler:
+            profiler.enable()
+        try:
+            func()
+        finally:
+            if profiler:
+                profiler.disable()
+
+    if profiler:
+        profiles.append((metrics["wall_s"], name, profiler))
+    return metrics
+
+
+def run_stage(stage, state, force=False, profiles=None):
+    """Executa a etapa, a menos que as entradas não tenham mudado desde a última execução."""
+    if not force and state.is_fresh(stage):
+        _skip(stage)
+        return
+
+    metrics = _measured(stage.name, stage.run, profiles)
+    _finish(stage, state, metrics["wall_s"])
+
+
+def run_overlapped(state, force=False, profiles=None, workers=data_processor.PROCESS_WORKERS, chunksize=data_processor.CSV_CHUNK_ROWS):
+    """
+    Ingestão e processamento sobrepostos: cada ZIP é enviado ao pool de
+    processamento assim que termina de baixar.
+
+    ZIPs idênticos aos da última consolidação ficam para o final e só são
+    processados se outra entrada tiver mudado (ou as saídas sumido).
+    Com um único worker, o processamento roda em uma thread ao lado dos downloads.
+    """
+    ingestion, processing = STAGES[0], STAGES[1]
+    previous = {} if force else state.recorded_inputs(processing)
+    task = partial(data_processor.process_partial, chunksize=chunksize)
+    lock = threading.Lock()
+    pending = {}
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else ThreadPoolExecutor(max_workers=1)
+
+    def submit(zip_path):
+        with lock:
+            if zip_path in pending:
+                return
+            sources = data_processor.list_zip_members([zip_path])
+            pending[zip_path] = [(source, executor.submit(task, source)) for source in sources]
+
+    def on_done(zip_path, written):
+        if written is None or not os.path.exists(zip_path):
+            return
+        if previous.get(zip_path) is not None and previous[zip_path] == state.fingerprint(zip_path):
+            return
+        print(f"[INFO] {os.path.basename(zip_path)} disponível: processamento iniciado.")
+        submit(zip_path)
+
+    def consolidate_pending():
+        print(">>> Consolidação de despesas (iniciada durante a ingestão) <<<")
+        for zip_path in processing.inputs():
+            submit(zip_path)
+
+        dfs = data_processor.gather_partials(
+            [pair for zip_path in sorted(pending) for pair in pending[zip_path]]
+        )
+        if not dfs:
+            print("[AVISO] Nenhum dado válido encontrado.")
+            return
+
+        data_processor.consolidate(dfs)
+        print(f"[SUCESSO] Arquivos gerados em {data_processor.PROCESSED_DIR}")
+
+    with executor:
+        metrics = _measured(ingestion.name, partial(ingestion.run, on_done=on_done), profiles)
+        _finish(ingestion, state, metrics["wall_s"])
+
+        print("\n" + "="*30 + "\n")
+
+        if not pending and not force and state.is_fresh(processing):
+            _skip(processing)
+            return
+
+        metrics = _measured(processing.name, consolidate_pending, profiles, overlapped=True)
+
+    print(f"[INFO] Consolidação concluída {metrics['wall_s']:.1f}s após o fim da ingestão.")
+    _finish(processing, state, metrics["wall_s"])
+
+
+def save_profile(report, profiles):
+    """Grava o perfil da etapa mais lenta ao lado do relatório e o resume no próprio relatório."""
+    elapsed, name, profiler = max(profiles, key=lambda item: item[0])
+    path = os.path.splitext(report)[0] + f"_{name}.prof"
+    profiler.dump_stats(path)
+
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+    instrumentation.emit("profile", step=name, wall_s=elapsed, path=path, top=summary.getvalue().splitlines())
+    print(f"[INFO] Perfil da etapa mais lenta ({name}, {elapsed:.1f}s) em {path}")
+
+
+def run(first=None, last=None, force=False, overlap=True, profile=False, incremental=False):
+    """
+    Executa as etapas de `first` até `last` (por padrão, todas), na ordem de STAGES.
+    Com `force=True`, ignora o estado e executa todas as etapas selecionadas.
+    Com `incremental=True`, usa INCREMENTAL_STAGES (sem sobreposição com a ingestão).
+
+    As medições de cada etapa vão para um relatório em data/reports; com
+    `profile=True`, o cProfile da etapa mais lenta é anexado a ele.
+    """
+    start_index = STAGE_NAMES.index(first) if first else 0
+    end_index = STAGE_NAMES.index(last) if last else len(STAGES) - 1
+    if start_index > end_index:
+        raise ValueError(f"Etapa inicial '{first}' vem depois da final '{last}'")
+
+    stages = INCREMENTAL_STAGES if incremental else STAGES
+    selected = stages[start_index:end_index + 1]
+    state = PipelineState()
+    profiles = [] if profile else None
+    report = instrumentation.start_run()
+    start = time.perf_counter()
+
+    try:
+        if overlap and not incremental and [stage.name for stage in selected[:2]] == ["ingestion", "processing"]:
+            run_overlapped(state, force, profiles)
+            selected = selected[2:]
+            if selected:
+                print("\n" + "="*30 + "\n")
+
+        for index, stage in enumerate(selected):
+            if index:
+                print("\n" + "="*30 + "\n")
+            run_stage(stage, state, force, profiles)
+
+        elapsed = time.perf_counter() - start
+        instrumentation.emit("run", wall_s=round(elapsed, 4), stages=[stage.name for stage in stages[start_index:end_index + 1]], incremental=incremental)
+        if profiles:
+            save_profile(report, profiles)
+    finally:
+        instrumentation.end_run()
+
+    print(f"\n[INFO] Tempo total: {elapsed:.1f}s")
+    print(f"[INFO] Relatório da execução: {report}")
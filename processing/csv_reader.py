@@ -0,0 +1,283 @@
+"""
+Leitura dos CSVs do pipeline (trimestres da ANS, CADOP e entregáveis).
+
+A codificação e o separador de cada arquivo são detectados uma única vez
+(`sniff`) e guardados em memória enquanto o arquivo não mudar (tamanho e
+mtime). Assim, um arquivo em latin1 não precisa mais falhar na leitura em
+utf-8 para então ser relido do início.
+
+A detecção decodifica o começo do arquivo. Se ele for todo ASCII, são
+lidas só algumas amostras espalhadas pelo restante (arquivos no disco), e o
+primeiro byte fora do ASCII decide entre utf-8 e latin1; o arquivo nunca é
+percorrido inteiro antes do parser. Se nada fora do ASCII aparecer, vale o
+utf-8, e um byte inválido encontrado depois pelo parser faz a leitura
+recomeçar em latin1 a partir da linha em que parou. O separador vem do
+cabeçalho.
+
+Todas as colunas são lidas como texto, e só as pedidas em `usecols`.
+Com o `pyarrow` instalado, a leitura usa o parser dele (ANS_CSV_ENGINE=pyarrow,
+padrão). Sem ele, ou com ANS_CSV_ENGINE=c, usa o parser C do pandas.
+"""
+
+import codecs
+import csv
+import os
+import threading
+import zipfile
+from collections import namedtuple
+from contextlib import closing, contextmanager
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except ImportError:
+    pa = pa_csv = None
+
+CSV_ENGINE = os.getenv("ANS_CSV_ENGINE", "pyarrow").lower()
+
+SNIFF_BYTES = 64 * 1024
+# Amostras de SNIFF_BYTES lidas ao longo de um arquivo cujo começo é todo ASCII
+SCAN_SAMPLES = 8
+DELIMITERS = (";", ",", "\t", "|")
+
+# Os mesmos valores que o pandas trata como ausentes por padrão
+NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+    "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+Dialect = namedtuple("Dialect", ["encoding", "sep", "columns", "bytes_per_row"])
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def engine():
+    """Parser efetivamente usado: "pyarrow" ou "c"."""
+    return "pyarrow" if CSV_ENGINE == "pyarrow" and pa_csv is not None else "c"
+
+
+@contextmanager
+def open_binary(path, member=None):
+    """Abre o CSV em modo binário, do disco ou de dentro do ZIP (`member`)."""
+    if member is None:
+        with open(path, "rb") as fh:
+            yield fh
+        return
+
+    with zipfile.ZipFile(path, "r") as zf:
+        with zf.open(member) as fh:
+            yield fh
+
+
+def sniff(path, member=None):
+    """
+    Codificação, separador, cabeçalho e tamanho médio das linhas do CSV.
+    O resultado fica em cache até o arquivo (ou o ZIP) mudar.
+    """
+    key, stamp = _cache_key(path, member)
+
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    with open_binary(path, member) as fh:
+        prefix = fh.read(SNIFF_BYTES)
+        encoding = _detect_encoding(prefix, fh if member is None else None)
+
+    dialect = _dialect(prefix, encoding)
+    _remember(path, member, dialect)
+    return dialect
+
+
+def _cache_key(path, member):
+    stat = os.stat(path)
+    return (os.path.abspath(path), member), (stat.st_size, stat.st_mtime_ns)
+
+
+def _remember(path, member, dialect):
+    key, stamp = _cache_key(path, member)
+    with _cache_lock:
+        _cache[key] = (stamp, dialect)
+
+
+def _block_encoding(block, partial_start=False):
+    """utf-8 ou latin1 pelo trecho fora do ASCII do bloco; None se ele for todo ASCII."""
+    if block.isascii():
+        return None
+    if partial_start:
+        # Uma amostra do meio do arquivo pode começar no meio de um caractere
+        skip = 0
+        while skip < 3 and skip < len(block) and 0x80 <= block[skip] < 0xC0:
+            skip += 1
+        block = block[skip:]
+    try:
+        # Sem `final`, um caractere cortado no fim do bloco não é erro
+        codecs.getincrementaldecoder("utf-8")().decode(block)
+    except UnicodeDecodeError:
+        return "latin1"
+    return "utf-8"
+
+
+def _sample_offsets(size):
+    """Início das amostras depois do prefixo, a última encostada no fim do arquivo."""
+    last = size - SNIFF_BYTES
+    if last <= SNIFF_BYTES:
+        return [SNIFF_BYTES] if size > SNIFF_BYTES else []
+    step = (last - SNIFF_BYTES) / (SCAN_SAMPLES - 1)
+    return sorted({SNIFF_BYTES + int(i * step) for i in range(SCAN_SAMPLES)})
+
+
+def _detect_encoding(prefix, fh=None):
+    """
+    Codificação pelo começo do arquivo e, se ele for todo ASCII, por até
+    SCAN_SAMPLES amostras do restante (só para arquivos no disco, `fh`).
+    """
+    if prefix.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+
+    encoding = _block_encoding(prefix)
+    if encoding or fh is None:
+        return encoding or "utf-8"
+
+    for offset in _sample_offsets(os.fstat(fh.fileno()).st_size):
+        fh.seek(offset)
+        encoding = _block_encoding(fh.read(SNIFF_BYTES), partial_start=True)
+        if encoding:
+            return encoding
+    return "utf-8"
+
+
+def _dialect(prefix, encoding):
+    lines = prefix.decode(encoding, errors="replace").splitlines()
+    header = lines[0] if lines else ""
+
+    # Em caso de empate vale a ordem de DELIMITERS, que começa pelo ";" da ANS
+    sep = max(DELIMITERS, key=header.count)
+    columns = next(csv.reader([header], delimiter=sep)) if header else []
+
+    # A última linha do prefixo pode ter sido cortada
+    rows = len(lines) - 1 if len(prefix) == SNIFF_BYTES else len(lines)
+    return Dialect(encoding, sep, columns, len(prefix) / max(rows, 1))
+
+
+def _select_columns(columns, usecols):
+    if usecols is None:
+        return list(columns)
+    if callable(usecols):
+        return [c for c in columns if usecols(c)]
+    wanted = set(usecols)
+    return [c for c in columns if c in wanted]
+
+
+def read_csv(path, member=None, usecols=None, chunksize=None, on_bad_lines="error"):
+    """
+    Lê o CSV como texto, com a codificação e o separador detectados.
+
+    `usecols` (lista de nomes ou função) é aplicado ao cabeçalho. Colunas
+    pedidas que não existem no arquivo são ignoradas, então quem chama deve
+    conferir as que precisa. Com `chunksize`, devolve um iterador de blocos
+    de aproximadamente esse número de linhas.
+    """
+    dialect = sniff(path, member)
+    if not dialect.columns:
+        raise pd.errors.EmptyDataError(f"CSV sem cabeçalho: {member or path}")
+
+    columns = _select_columns(dialect.columns, usecols)
+    reader = _read_pyarrow if engine() == "pyarrow" else _read_pandas
+    chunks = _read_with_fallback(reader, path, member, dialect, columns, chunksize, on_bad_lines)
+
+    if chunksize:
+        return chunks
+    with closing(chunks):
+        return next(chunks)
+
+
+def _is_decode_error(exc):
+    if isinstance(exc, UnicodeDecodeError):
+        return True
+    return pa is not None and isinstance(exc, pa.ArrowInvalid) and "invalid UTF8" in str(exc)
+
+
+def _read_with_fallback(reader, path, member, dialect, columns, chunksize, on_bad_lines):
+    """
+    Lê com a codificação detectada. Se ela for utf-8 e o parser encontrar
+    um byte inválido fora das amostras de `sniff`, a leitura recomeça em
+    latin1, pulando as linhas já entregues, e o cache é corrigido.
+    """
+    delivered = 0
+    try:
+        for chunk in reader(path, member, dialect, columns, chunksize, on_bad_lines):
+            delivered += len(chunk)
+            yield chunk
+        return
+    except ValueError as exc:
+        if dialect.encoding != "utf-8" or not _is_decode_error(exc):
+            raise
+
+    print(f"[AVISO] {member or path}: byte inválido em utf-8, relendo em latin1.")
+    dialect = dialect._replace(encoding="latin1")
+    _remember(path, member, dialect)
+
+    for chunk in reader(path, member, dialect, columns, chunksize, on_bad_lines):
+        if delivered >= len(chunk):
+            delivered -= len(chunk)
+            continue
+        yield chunk.iloc[delivered:] if delivered else chunk
+        delivered = 0
+
+
+def _read_pandas(path, member, dialect, columns, chunksize, on_bad_lines):
+    options = dict(
+        sep=dialect.sep, encoding=dialect.encoding, dtype=str,
+        usecols=columns, on_bad_lines=on_bad_lines,
+    )
+    with _source(path, member) as source:
+        if chunksize:
+            yield from pd.read_csv(source, chunksize=chunksize, **options)
+        else:
+            yield pd.read_csv(source, **options)
+
+
+def _read_pyarrow(path, member, dialect, columns, chunksize, on_bad_lines):
+    # O pyarrow descarta o BOM do utf-8 por conta própria
+    encoding = "utf8" if dialect.encoding.startswith("utf-8") else dialect.encoding
+    read_options = pa_csv.ReadOptions(encoding=encoding)
+    if chunksize:
+        # Os blocos do pyarrow são medidos em bytes, não em linhas
+        read_options.block_size = max(int(chunksize * dialect.bytes_per_row), SNIFF_BYTES)
+
+    parse_options = pa_csv.ParseOptions(delimiter=dialect.sep)
+    if on_bad_lines == "skip":
+        parse_options.invalid_row_handler = lambda row: "skip"
+
+    convert_options = pa_csv.ConvertOptions(
+        include_columns=columns,
+        column_types={c: pa.string() for c in columns},
+        null_values=NA_VALUES,
+        strings_can_be_null=True,
+    )
+    options = dict(read_options=read_options, parse_options=parse_options, convert_options=convert_options)
+
+    with _source(path, member) as source:
+        if not chunksize:
+            yield pa_csv.read_csv(source, **options).to_pandas()
+            return
+
+        for batch in pa_csv.open_csv(source, **options):
+            if batch.num_rows:
+                yield batch.to_pandas()
+
+
+@contextmanager
+def _source(path, member):
+    """Caminho do arquivo no disco (lido direto pelo parser) ou o membro do ZIP aberto."""
+    if member is None:
+        yield path
+        return
+
+    with open_binary(path, member) as fh:
+        yield fh
@@ -2,6 +2,8 @@ import pandas as pd
 import os
 import zipfile
 import re
+from processing import csv_reader, intermediate, normalizers
+import instrumentation
 
 
 PROCESSED_DIR = os.path.join("data", "processed")
@@ -13,6 +15,9 @@ CADOP_CSV = os.path.join(RAW_DIR, "Relatorio_Cadop.csv")
 OUTPUT_CSV = os.path.join(PROCESSED_DIR, "despesas_agregadas.csv")
 OUTPUT_ZIP = os.path.join(PROCESSED_DIR, "Teste_Joao_Vitor.zip")
 
+# Colunas do CADOP usadas no cruzamento; as demais não são carregadas
+CADOP_COLUMNS = ["REGISTRO_OPERADORA", "CNPJ", "Razao_Social", "Modalidade", "UF"]
+
 
 def format_cnpj(value: str) -> str:
     """
@@ -27,51 +32,12 @@ def format_cnpj(value: str) -> str:
     return f"{digits[:2]}.{digits[2:5]}.{digits[5:8]}/{digits[8:12]}-{digits[12:]}"
 
 
-def run() -> None:
+def load_cadop():
     """
-    Executa a etapa de enriquecimento e agregação dos dados,
-    realizando o cruzamento com o CADOP, validações e geração do CSV final.
+    Lê o CADOP e renomeia as colunas usadas no cruzamento.
+    Retorna None se a coluna de registro da operadora não existir.
     """
-    print(">>> Iniciando Etapa 2: Enriquecimento e Agregação <<<")
-
-    if not os.path.exists(INPUT_CSV):
-        print(f"[ERRO] Arquivo de entrada não encontrado: {INPUT_CSV}")
-        return
-
-    if not os.path.exists(CADOP_CSV):
-        print(f"[ERRO] Arquivo do CADOP não encontrado: {CADOP_CSV}")
-        return
-
-    print("[INFO] Lendo arquivos CSV...")
-
-    try:
-        expenses_df = pd.read_csv(
-            INPUT_CSV, sep=";", decimal=",", encoding="utf-8", dtype=str
-        )
-    except:
-        expenses_df = pd.read_csv(
-            INPUT_CSV, sep=";", decimal=",", encoding="latin1", dtype=str
-        )
-
-    try:
-        cadop_df = pd.read_csv(
-            CADOP_CSV, sep=";", encoding="utf-8", dtype=str
-        )
-    except:
-        try:
-            cadop_df = pd.read_csv(
-                CADOP_CSV, sep=";", encoding="latin1", dtype=str
-            )
-        except:
-            cadop_df = pd.read_csv(
-                CADOP_CSV, sep=",", encoding="latin1", dtype=str
-            )
-
-    print("[INFO] Preparando chaves...")
-
-    expenses_df["REG_ANS"] = expenses_df["RazaoSocial"].apply(
-        lambda x: str(x).split(" ")[-1]
-    )
+    cadop_df = csv_reader.read_csv(CADOP_CSV, usecols=CADOP_COLUMNS)
 
     cadop_df = cadop_df.rename(
         columns={
@@ -84,8 +50,16 @@ def run() -> None:
 
     if "REG_ANS" not in cadop_df.columns:
         print("[ERRO FATAL] Coluna REG_ANS não encontrada no CADOP.")
-        return
+        return None
+
+    return cadop_df
 
+
+def enrich_with_cadop(expenses_df: pd.DataFrame, cadop_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cruza as despesas com o CADOP pelo REG_ANS (left join) e preenche
+    CNPJ, Razão Social, UF e Modalidade, validando o formato do CNPJ.
+    """
     print("[INFO] Realizando o cruzamento...")
 
     final_df = pd.merge(expenses_df, cadop_df, on="REG_ANS", how="left")
@@ -103,32 +77,22 @@ def run() -> None:
 
     print("[INFO] Validando e formatando dados...")
 
-    final_df["CNPJ"] = final_df["CNPJ"].apply(format_cnpj)
+    final_df["CNPJ"] = normalizers.format_cnpj(final_df["CNPJ"])
 
-    final_df["ValorDespesas"] = final_df["ValorDespesas"].apply(
-        lambda x: float(str(x).replace(",", "."))
-    )
-
-    final_df["CNPJ_Valido"] = final_df["CNPJ"].apply(
-        lambda x: len(re.sub(r"\D", "", str(x))) == 14
-    )
+    final_df["CNPJ_Valido"] = normalizers.is_valid_cnpj(final_df["CNPJ"])
 
     invalid_count = len(final_df[~final_df["CNPJ_Valido"]])
     if invalid_count > 0:
         print(f"[AVISO] {invalid_count} registros com CNPJ incompleto ou ausente.")
 
-    print("[INFO] Calculando estatísticas...")
+    return final_df
 
-    aggregated_df = (
-        final_df.groupby(["REG_ANS", "RazaoSocial", "CNPJ", "Modalidade", "UF"])["ValorDespesas"]
-        .agg(
-            Total_Despesas="sum",
-            Media_Trimestral="mean",
-            Desvio_Padrao="std",
-        )
-        .reset_index()
-    )
 
+def save_aggregated(aggregated_df: pd.DataFrame) -> None:
+    """
+    Ordena, arredonda e grava as estatísticas por operadora
+    no CSV final, no ZIP de entrega e no intermediário colunar.
+    """
     aggregated_df = aggregated_df.sort_values(
         by="Total_Despesas", ascending=False
     )
@@ -169,8 +133,78 @@ def run() -> None:
     with zipfile.ZipFile(OUTPUT_ZIP, "w", zipfile.ZIP_DEFLATED) as zip_file:
         zip_file.write(OUTPUT_CSV, arcname="despesas_agregadas.csv")
 
+    if intermediate.write_agregado(aggregated_df):
+        print(f"[INFO] Intermediário colunar gerado: {intermediate.AGREGADO_PARQUET}")
+
+
+def run() -> None:
+    """
+    Executa a etapa de enriquecimento e agregação dos dados,
+    realizando o cruzamento com o CADOP, validações e geração do CSV final.
+    """
+    print(">>> Iniciando Etapa 2: Enriquecimento e Agregação <<<")
+
+    if not os.path.exists(INPUT_CSV):
+        print(f"[ERRO] Arquivo de entrada não encontrado: {INPUT_CSV}")
+        return
+
+    if not os.path.exists(CADOP_CSV):
+        print(f"[ERRO] Arquivo do CADOP não encontrado: {CADOP_CSV}")
+        return
+
+    print("[INFO] Lendo arquivos CSV...")
+
+    with instrumentation.step("enrichment.read") as metrics:
+        expenses_df = intermediate.read_consolidado(INPUT_CSV)
+
+        if expenses_df is not None:
+            print(f"[INFO] Consolidado lido do intermediário colunar: {intermediate.CONSOLIDADO_PARQUET}")
+            metrics["bytes_read"] = instrumentation.file_size(intermediate.CONSOLIDADO_PARQUET)
+            expenses_df["REG_ANS"] = expenses_df["REG_ANS"].astype(str)
+            expenses_df["RazaoSocial"] = "Operadora ANS " + expenses_df["REG_ANS"]
+        else:
+            metrics["bytes_read"] = instrumentation.file_size(INPUT_CSV)
+            expenses_df = csv_reader.read_csv(INPUT_CSV)
+
+            expenses_df["REG_ANS"] = normalizers.reg_ans_from_razao(expenses_df["RazaoSocial"])
+
+        if not pd.api.types.is_numeric_dtype(expenses_df["ValorDespesas"]):
+            expenses_df["ValorDespesas"] = normalizers.parse_decimal_comma(expenses_df["ValorDespesas"])
+        metrics["rows_out"] = len(expenses_df)
+
+    print("[INFO] Preparando chaves...")
+
+    with instrumentation.step("enrichment.cadop", bytes_read=instrumentation.file_size(CADOP_CSV)) as metrics:
+        cadop_df = load_cadop()
+        metrics["rows_out"] = 0 if cadop_df is None else len(cadop_df)
+    if cadop_df is None:
+        return
+
+    with instrumentation.step("enrichment.merge", rows_in=len(expenses_df)) as metrics:
+        final_df = enrich_with_cadop(expenses_df, cadop_df)
+        metrics["rows_out"] = len(final_df)
+
+    print("[INFO] Calculando estatísticas...")
+
+    with instrumentation.step("enrichment.aggregate", rows_in=len(final_df)) as metrics:
+        aggregated_df = (
+            final_df.groupby(["REG_ANS", "RazaoSocial", "CNPJ", "Modalidade", "UF"])["ValorDespesas"]
+            .agg(
+                Total_Despesas="sum",
+                Media_Trimestral="mean",
+                Desvio_Padrao="std",
+            )
+            .reset_index()
+        )
+        metrics["rows_out"] = len(aggregated_df)
+
+    with instrumentation.step("enrichment.save", rows_in=len(aggregated_df)) as metrics:
+        save_aggregated(aggregated_df)
+        outputs = [OUTPUT_CSV, OUTPUT_ZIP] + ([intermediate.AGREGADO_PARQUET] if intermediate.enabled() else [])
+        metrics["bytes_written"] = instrumentation.file_size(*outputs)
+
     print(">>> Processo finalizado com sucesso! <<<")
 
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    run()
@@ -3,6 +3,11 @@ import zipfile
 import glob
 import pandas as pd
 import re
+from functools import partial
+from processing import csv_reader, intermediate
+from processing.normalizers import parse_currency
+from concurrent.futures import ProcessPoolExecutor
+import instrumentation
 
 RAW_DIR = os.path.join("data", "raw")
 PROCESSED_DIR = os.path.join("data", "processed")
@@ -11,6 +16,10 @@ EXTRACT_DIR = os.path.join(PROCESSED_DIR, "extracted")
 FINAL_CSV = os.path.join(PROCESSED_DIR, "consolidado_despesas.csv")
 FINAL_ZIP = os.path.join(PROCESSED_DIR, "consolidado_despesas.zip")
 
+PROCESS_WORKERS = int(os.getenv("ANS_PROCESS_WORKERS", 1))
+CSV_CHUNK_ROWS = int(os.getenv("ANS_CSV_CHUNK_ROWS", 200_000))
+GROUP_KEYS = ['REG_ANS', 'Ano', 'Trimestre']
+
 COLUMN_MAP = {
     "CD_OPERADORA": "REG_ANS",
     "RegistroANS": "REG_ANS",
@@ -48,6 +57,30 @@ def extract_zips():
             print(f"[ERRO] ZIP inválido: {zip_path}")
 
 
+def list_zip_members(zip_files=None):
+    """
+    Lista os CSVs contidos nos ZIPs (por padrão, todos de data/raw) sem extraí-los.
+    Retorna pares (caminho do ZIP, nome do membro).
+    """
+    if zip_files is None:
+        zip_files = sorted(glob.glob(os.path.join(RAW_DIR, "*.zip")))
+    if not zip_files:
+        print("[AVISO] Nenhum ZIP encontrado em data/raw.")
+        return []
+
+    members = []
+    for zip_path in zip_files:
+        try:
+            with zipfile.ZipFile(zip_path, 'r') as zf:
+                for name in zf.namelist():
+                    if name.lower().endswith('.csv'):
+                        members.append((zip_path, name))
+        except zipfile.BadZipFile:
+            print(f"[ERRO] ZIP inválido: {zip_path}")
+
+    return members
+
+
 def clean_currency(valor):
     """Normaliza valores monetários para float."""
     if pd.isna(valor):
@@ -79,37 +112,100 @@ def get_periodo_from_filename(filename):
     return ano, trimestre
 
 
-def process_file(filepath):
-    """Filtra e normaliza registros de despesas com eventos/sinistros."""
-    filename = os.path.basename(filepath)
+def _select_expenses(df):
+    """
+    Aplica o mapeamento de colunas e mantém apenas as linhas de
+    despesas com eventos/sinistros com valor positivo.
+    Retorna None se as colunas mínimas não existirem.
+    """
+    df = df.rename(columns=COLUMN_MAP)
 
-    try:
-        try:
-            df = pd.read_csv(filepath, sep=';', encoding='utf-8', dtype=str)
-        except UnicodeDecodeError:
-            df = pd.read_csv(filepath, sep=';', encoding='latin1', dtype=str)
-
-        df.rename(columns=COLUMN_MAP, inplace=True)
+    required = {'REG_ANS', 'VL_SALDO_FINAL', 'DESCRICAO'}
+    if not required.issubset(df.columns):
+        return None
 
-        required = {'REG_ANS', 'VL_SALDO_FINAL', 'DESCRICAO'}
-        if not required.issubset(df.columns):
+    filtro = (
+        df['DESCRICAO']
+        .astype(str)
+        .str.strip()
+        .str.lower()
+        .str.replace(r'\s+', ' ', regex=True)
+        .str.replace(' / ', '/', regex=False)
+    ) == 'despesas com eventos/sinistros'
+
+    df = df.loc[filtro, ['REG_ANS', 'VL_SALDO_FINAL']].copy()
+    df['VL_SALDO_FINAL'] = parse_currency(df['VL_SALDO_FINAL'])
+    return df[df['VL_SALDO_FINAL'] > 0]
+
+
+def _read_expenses(filepath, member, chunksize, metrics=None):
+    """
+    Lê apenas as colunas de COLUMN_MAP e devolve as despesas filtradas.
+
+    Com `chunksize`, o arquivo é percorrido em blocos: cada bloco é filtrado
+    e somado por REG_ANS, e só o acumulado segue para o próximo bloco.
+    Assim o pico de memória depende do tamanho do bloco, não do arquivo.
+    As linhas lidas são contadas em `metrics["rows_in"]`.
+    """
+    metrics = {} if metrics is None else metrics
+    metrics["rows_in"] = 0
+
+    if not chunksize:
+        df = csv_reader.read_csv(filepath, member, usecols=COLUMN_MAP)
+        metrics["rows_in"] = len(df)
+        return _select_expenses(df)
+
+    totals = None
+    for chunk in csv_reader.read_csv(filepath, member, usecols=COLUMN_MAP, chunksize=chunksize):
+        metrics["rows_in"] += len(chunk)
+        df = _select_expenses(chunk)
+        if df is None:
             return None
+        if df.empty:
+            continue
 
-        filtro = (
-            df['DESCRICAO']
-            .astype(str)
-            .str.strip()
-            .str.lower()
-            .str.replace(r'\s+', ' ', regex=True)
-            .str.replace(' / ', '/', regex=False)
-        ) == 'despesas com eventos/sinistros'
+        if totals is not None:
+            df = pd.concat([totals, df], ignore_index=True)
+        totals = df.groupby('REG_ANS', as_index=False)['VL_SALDO_FINAL'].sum()
+
+    return totals
+
+
+def process_file(filepath, member=None, chunksize=CSV_CHUNK_ROWS):
+    """
+    Filtra e normaliza registros de despesas com eventos/sinistros.
+
+    Quando `member` é informado, `filepath` é o ZIP e o CSV é lido
+    diretamente do arquivo compactado, sem extração para o disco.
+    Com `chunksize` (linhas), a leitura é feita em blocos e o resultado
+    já vem somado por REG_ANS; com 0 ou None o arquivo é lido inteiro.
+    """
+    filename = os.path.basename(member or filepath)
+
+    with instrumentation.step("processing.file", file=filename) as metrics:
+        metrics["bytes_read"] = _source_size(filepath, member)
+        df = _process_file(filepath, member, chunksize, filename, metrics)
+        metrics["rows_out"] = 0 if df is None else len(df)
+    return df
 
-        df = df[filtro].copy()
-        if df.empty:
-            return None
 
-        df['VL_SALDO_FINAL'] = df['VL_SALDO_FINAL'].apply(clean_currency)
-        df = df[df['VL_SALDO_FINAL'] > 0]
+def _source_size(filepath, member):
+    """Bytes descompactados do CSV a ser lido."""
+    try:
+        if member is None:
+            return os.path.getsize(filepath)
+        with zipfile.ZipFile(filepath, 'r') as zf:
+            return zf.getinfo(member).file_size
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return None
+
+
+def _process_file(filepath, member, chunksize, filename, metrics):
+    try:
+        df = _read_expenses(filepath, member, chunksize, metrics)
+
+        if df is None or df.empty:
+            return None
 
         ano, trimestre = get_periodo_from_filename(filename)
         df['Ano'] = ano
@@ -122,40 +218,91 @@ def process_file(filepath):
         return None
 
 
-def run():
-    print(">>> Iniciando consolidação de despesas <<<")
+def process_partial(source, chunksize=CSV_CHUNK_ROWS):
+    """
+    Processa um arquivo e já devolve a soma parcial por (REG_ANS, Ano, Trimestre),
+    reduzindo o volume trafegado entre os processos do pool.
+    """
+    filepath, member = source
+    df = process_file(filepath, member, chunksize)
+    if df is None:
+        return None
+    return df.groupby(GROUP_KEYS, as_index=False)['VL_SALDO_FINAL'].sum()
 
-    extract_zips()
 
-    csv_files = glob.glob(os.path.join(EXTRACT_DIR, "**", "*.csv"), recursive=True)
-    if not csv_files:
-        csv_files = glob.glob(os.path.join(EXTRACT_DIR, "*.csv"))
+def collect_partials(sources, workers=PROCESS_WORKERS, chunksize=CSV_CHUNK_ROWS):
+    """
+    Executa `process_partial` para cada arquivo, em série ou em um pool de
+    processos. Os resultados mantêm a ordem de `sources`, e a falha de um
+    arquivo (inclusive a queda do processo) não interrompe os demais.
+    """
+    task = partial(process_partial, chunksize=chunksize)
 
-    print(f"[INFO] {len(csv_files)} arquivos encontrados.")
+    if workers <= 1 or len(sources) <= 1:
+        return [df for df in map(task, sources) if df is not None]
 
-    dfs = []
-    for f in csv_files:
-        df_temp = process_file(f)
-        if df_temp is not None:
-            dfs.append(df_temp)
+    with ProcessPoolExecutor(max_workers=min(workers, len(sources))) as executor:
+        return gather_partials([(source, executor.submit(task, source)) for source in sources])
 
-    if not dfs:
-        print("[AVISO] Nenhum dado válido encontrado.")
-        return
 
-    full_df = pd.concat(dfs, ignore_index=True)
+def gather_partials(pending):
+    """
+    Aguarda os pares (arquivo, future) de `process_partial` na ordem recebida
+    e devolve as somas parciais válidas, registrando as falhas no log.
+    """
+    partials = []
+    for (filepath, member), future in pending:
+        try:
+            df = future.result()
+        except Exception as e:
+            print(f"[ERRO] Falha ao processar {os.path.basename(member or filepath)}: {e}")
+            continue
+        if df is not None:
+            partials.append(df)
+
+    return partials
+
+
+def consolidate(dfs):
+    """Combina as somas parciais por (REG_ANS, Ano, Trimestre) e grava o consolidado."""
+    with instrumentation.step("processing.merge") as metrics:
+        full_df = pd.concat(dfs, ignore_index=True)
+        metrics["rows_in"] = len(full_df)
+
+        df_consolidado = (
+            full_df
+            .groupby(GROUP_KEYS, as_index=False)['VL_SALDO_FINAL']
+            .sum()
+        )
+
+        df_consolidado['VL_SALDO_FINAL'] = df_consolidado['VL_SALDO_FINAL'].round(2)
+        df_consolidado.rename(columns={'VL_SALDO_FINAL': 'ValorDespesas'}, inplace=True)
+        metrics["rows_out"] = len(df_consolidado)
+
+    save_consolidated(df_consolidado)
+
+
+def save_consolidated(df_consolidado, append=False):
+    """
+    Grava o consolidado (REG_ANS, Ano, Trimestre, ValorDespesas) no layout
+    de entrega (CSV + ZIP) e no intermediário colunar.
+
+    Com `append=True`, as linhas são acrescentadas ao CSV existente (quem
+    chama garante que são de trimestres posteriores aos já gravados). O
+    Parquet não aceita acréscimos e é removido, então as etapas seguintes
+    voltam a ler o CSV.
+    """
+    with instrumentation.step("processing.save", rows_in=len(df_consolidado), append=append) as metrics:
+        _write_consolidated(df_consolidado, append)
+        outputs = [FINAL_CSV, FINAL_ZIP] + ([intermediate.CONSOLIDADO_PARQUET] if intermediate.enabled() else [])
+        metrics["bytes_written"] = instrumentation.file_size(*outputs)
 
-    df_consolidado = (
-        full_df
-        .groupby(['REG_ANS', 'Ano', 'Trimestre'], as_index=False)['VL_SALDO_FINAL']
-        .sum()
-    )
 
-    df_consolidado['VL_SALDO_FINAL'] = df_consolidado['VL_SALDO_FINAL'].round(2)
+def _write_consolidated(df_consolidado, append=False):
+    df_consolidado = df_consolidado.copy()
     df_consolidado['RazaoSocial'] = 'Operadora ANS ' + df_consolidado['REG_ANS'].astype(str)
     df_consolidado['CNPJ'] = ''
 
-    df_consolidado.rename(columns={'VL_SALDO_FINAL': 'ValorDespesas'}, inplace=True)
     df_consolidado.sort_values(by=['Ano', 'Trimestre', 'RazaoSocial'], inplace=True)
 
     df_final = df_consolidado[['CNPJ', 'RazaoSocial', 'Trimestre', 'Ano', 'ValorDespesas']]
@@ -167,12 +314,53 @@ def run():
         index=False,
         sep=';',
         decimal=',',
-        encoding='latin1'
+        encoding='latin1',
+        mode='a' if append else 'w',
+        header=not append
     )
 
     with zipfile.ZipFile(FINAL_ZIP, 'w', zipfile.ZIP_DEFLATED) as zf:
         zf.write(FINAL_CSV, arcname="consolidado_despesas.csv")
 
+    if append:
+        if os.path.exists(intermediate.CONSOLIDADO_PARQUET):
+            os.remove(intermediate.CONSOLIDADO_PARQUET)
+    elif intermediate.write_consolidado(df_consolidado):
+        print(f"[INFO] Intermediário colunar gerado: {intermediate.CONSOLIDADO_PARQUET}")
+
+
+def run(stream_zip=True, workers=PROCESS_WORKERS, chunksize=CSV_CHUNK_ROWS):
+    """
+    Consolida as despesas dos trimestres baixados.
+
+    Por padrão os CSVs são lidos direto dos ZIPs (`stream_zip=True`);
+    com `stream_zip=False` mantém a extração prévia para data/processed/extracted.
+    Com `workers` > 1 os arquivos são processados em paralelo
+    (também configurável pela variável ANS_PROCESS_WORKERS).
+    `chunksize` define quantas linhas são lidas por bloco (ANS_CSV_CHUNK_ROWS).
+    """
+    print(">>> Iniciando consolidação de despesas <<<")
+
+    if stream_zip:
+        sources = list_zip_members()
+    else:
+        extract_zips()
+
+        csv_files = glob.glob(os.path.join(EXTRACT_DIR, "**", "*.csv"), recursive=True)
+        if not csv_files:
+            csv_files = glob.glob(os.path.join(EXTRACT_DIR, "*.csv"))
+        sources = [(f, None) for f in csv_files]
+
+    print(f"[INFO] {len(sources)} arquivos encontrados.")
+
+    dfs = collect_partials(sources, workers, chunksize)
+
+    if not dfs:
+        print("[AVISO] Nenhum dado válido encontrado.")
+        return
+
+    consolidate(dfs)
+
     print(f"[SUCESSO] Arquivos gerados em {PROCESSED_DIR}")
     print(">>> Processo finalizado <<<")
 
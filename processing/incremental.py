@@ -0,0 +1,337 @@
+"""
+Modo incremental da consolidação e da agregação.
+
+Cada trimestre é guardado como uma partição própria em
+data/processed/particoes, e as estatísticas por operadora são mantidas em
+um estado acumulado (quantidade, soma e M2 da variância). Esse estado pode
+ser combinado e "descombinado" (fórmulas de Chan et al.), então um
+trimestre novo ou republicado só precisa ter a sua própria partição
+processada: a versão antiga é retirada do estado e a nova é somada.
+
+O estado e as partições de cada execução são gravados em arquivos novos
+(sufixo `.g<geração>`) e só passam a valer quando o catálogo
+(estado_incremental.json) é substituído, de uma vez, apontando para eles.
+Uma interrupção antes disso deixa o catálogo anterior intacto, e o
+trimestre não é contado em dobro nem perdido.
+
+Uso (na raiz do projeto):
+    python -m processing.incremental
+ou, no pipeline, `python main.py --incremental`.
+"""
+
+import glob
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from ingestion.manifest import Manifest
+from processing import data_enrichment, data_processor, intermediate
+
+PARTITIONS_DIR = os.path.join(data_processor.PROCESSED_DIR, "particoes")
+STATE_BASE = os.path.join(data_processor.PROCESSED_DIR, "estado_agregado")
+CATALOG_PATH = os.path.join(data_processor.PROCESSED_DIR, "estado_incremental.json")
+
+MANIFEST_STAGE = "processing_incremental"
+STATE_COLUMNS = ["n", "total", "m2"]
+
+
+def _table_path(base):
+    return base + (".parquet" if intermediate.enabled() else ".csv")
+
+
+def _save_table(df, base):
+    """Grava a tabela no formato configurado e devolve o caminho."""
+    path = _table_path(base)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if intermediate.enabled():
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False, sep=";")
+    return path
+
+
+def _load_table(path):
+    if path is None or not os.path.exists(path):
+        return None
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path, sep=";", dtype={"REG_ANS": str})
+    df["REG_ANS"] = df["REG_ANS"].astype(str)
+    return df
+
+
+def _partition_key(ano, trimestre):
+    return f"{int(ano)}T{int(trimestre)}"
+
+
+def _period(key):
+    ano, trimestre = key.split("T")
+    return int(ano), int(trimestre)
+
+
+def load_catalog():
+    """
+    Catálogo da última execução confirmada: geração, arquivo do estado,
+    partição de cada trimestre e a situação do consolidado gravado.
+    """
+    if os.path.exists(CATALOG_PATH):
+        with open(CATALOG_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    # Layout anterior ao catálogo: um arquivo de estado e uma partição por trimestre
+    state_paths = [p for p in glob.glob(STATE_BASE + ".*") if os.path.splitext(p)[1] in (".parquet", ".csv")]
+    return {
+        "generation": 0,
+        "state": state_paths[0] if state_paths else None,
+        "partitions": {
+            os.path.splitext(os.path.basename(p))[0]: p
+            for p in sorted(glob.glob(os.path.join(PARTITIONS_DIR, "*")))
+        },
+        "consolidado": None,
+    }
+
+
+def save_catalog(catalog):
+    """Grava o catálogo de forma atômica; é o ponto de confirmação da execução."""
+    os.makedirs(os.path.dirname(CATALOG_PATH), exist_ok=True)
+    tmp_path = CATALOG_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(catalog, f, indent=2)
+    os.replace(tmp_path, CATALOG_PATH)
+
+
+def partition_stats(df):
+    """Estatísticas combináveis (n, soma, M2) por REG_ANS de uma partição."""
+    values = df.groupby("REG_ANS")["ValorDespesas"]
+    stats = values.agg(n="count", total="sum")
+
+    mean = df["REG_ANS"].map(stats["total"] / stats["n"])
+    stats["m2"] = ((df["ValorDespesas"] - mean) ** 2).groupby(df["REG_ANS"]).sum()
+    return stats
+
+
+def combine_stats(current, other, sign=1):
+    """
+    Soma (`sign=1`) ou retira (`sign=-1`) as estatísticas de uma partição
+    do estado acumulado, operadora a operadora.
+    """
+    current, other = current.align(other, join="outer", fill_value=0)
+    other = other[STATE_COLUMNS].astype(float)
+    current = current[STATE_COLUMNS].astype(float)
+
+    n_b, t_b, m2_b = other["n"], other["total"], other["m2"]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if sign > 0:
+            n_a, t_a = current["n"], current["total"]
+            n = n_a + n_b
+            delta = t_b / n_b - t_a / n_a
+            correction = np.where((n_a > 0) & (n_b > 0), delta ** 2 * n_a * n_b / n, 0.0)
+            m2 = current["m2"] + m2_b + correction
+            total = t_a + t_b
+        else:
+            n_full, t_full = current["n"], current["total"]
+            n = n_full - n_b
+            total = t_full - t_b
+            delta = t_b / n_b - total / n
+            correction = np.where((n > 0) & (n_b > 0), delta ** 2 * n * n_b / n_full, 0.0)
+            m2 = current["m2"] - m2_b - correction
+
+    result = pd.DataFrame({"n": n, "total": total, "m2": np.clip(m2, 0, None)})
+    return result[result["n"] > 0]
+
+
+def load_state(catalog):
+    df = _load_table(catalog["state"])
+    if df is None:
+        return None
+    return df.set_index("REG_ANS")[STATE_COLUMNS]
+
+
+def commit(catalog, state, partitions):
+    """
+    Grava o estado da nova geração e confirma o catálogo. Só depois disso
+    os arquivos que deixaram de ser referenciados são apagados.
+    """
+    generation = catalog["generation"] + 1
+    state_path = _save_table(state.rename_axis("REG_ANS").reset_index(), f"{STATE_BASE}.g{generation}")
+
+    catalog = dict(catalog, generation=generation, state=state_path, partitions=partitions)
+    save_catalog(catalog)
+
+    referenced = {os.path.abspath(p) for p in [state_path, *partitions.values()]}
+    for path in glob.glob(STATE_BASE + ".*") + glob.glob(os.path.join(PARTITIONS_DIR, "*")):
+        if os.path.abspath(path) not in referenced:
+            os.remove(path)
+    return catalog
+
+
+def process_archives(zip_paths, chunksize=data_processor.CSV_CHUNK_ROWS):
+    """
+    Consolida os ZIPs em linhas (REG_ANS, Ano, Trimestre, ValorDespesas).
+
+    Como em `data_processor.consolidate`, as somas parciais de todos os
+    arquivos são combinadas antes do arredondamento, então um trimestre
+    presente em mais de um ZIP da mesma execução vira uma única partição.
+    """
+    sources = data_processor.list_zip_members(zip_paths)
+    dfs = data_processor.collect_partials(sources, workers=1, chunksize=chunksize)
+    if not dfs:
+        return None
+
+    df = (
+        pd.concat(dfs, ignore_index=True)
+        .groupby(data_processor.GROUP_KEYS, as_index=False)["VL_SALDO_FINAL"]
+        .sum()
+    )
+    df["VL_SALDO_FINAL"] = df["VL_SALDO_FINAL"].round(2)
+    df["REG_ANS"] = df["REG_ANS"].astype(str)
+    return df.rename(columns={"VL_SALDO_FINAL": "ValorDespesas"})
+
+
+def apply_partition(state, new_df, partitions, generation):
+    """
+    Substitui a partição do trimestre de `new_df` e atualiza o estado.
+
+    A nova partição vai para um arquivo da geração `generation`, e
+    `partitions` (trimestre -> caminho) é atualizado; o arquivo antigo só
+    deixa de valer quando o catálogo for confirmado por `commit`.
+    """
+    ano, trimestre = new_df[["Ano", "Trimestre"]].iloc[0]
+    key = _partition_key(ano, trimestre)
+
+    old_df = _load_table(partitions.get(key))
+    if old_df is not None:
+        state = combine_stats(state, partition_stats(old_df), sign=-1)
+        print(f"[INFO] Trimestre {trimestre}T{ano} republicado: substituindo partição.")
+
+    state = combine_stats(state, partition_stats(new_df))
+    partitions[key] = _save_table(new_df, os.path.join(PARTITIONS_DIR, f"{key}.g{generation}"))
+    return state
+
+
+def _consolidated_stamp():
+    if not os.path.exists(data_processor.FINAL_CSV):
+        return None
+    stat = os.stat(data_processor.FINAL_CSV)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def update_consolidated(catalog, changed, previous_generation):
+    """
+    Acrescenta ao consolidado apenas as partições `changed`.
+
+    O acréscimo só é possível se o CSV gravado corresponder à geração
+    anterior (mesmo tamanho e mtime registrados) e se todos os trimestres
+    alterados forem posteriores ao último já gravado. Um trimestre
+    republicado ou fora de ordem, ou um CSV regravado por outra rotina,
+    faz o consolidado ser refeito a partir de todas as partições.
+    """
+    partitions = catalog["partitions"]
+    recorded = catalog.get("consolidado")
+    in_sync = (
+        recorded is not None
+        and recorded["generation"] == previous_generation
+        and recorded["stamp"] == _consolidated_stamp()
+    )
+
+    if in_sync and all(_period(key) > tuple(recorded["last"]) for key in changed):
+        if changed:
+            new_rows = pd.concat([_load_table(partitions[key]) for key in sorted(changed, key=_period)], ignore_index=True)
+            data_processor.save_consolidated(new_rows, append=True)
+    elif partitions:
+        print("[INFO] Regravando o consolidado a partir de todas as partições.")
+        data_processor.save_consolidated(pd.concat([_load_table(p) for p in partitions.values()], ignore_index=True))
+    else:
+        return catalog
+
+    catalog = dict(catalog, consolidado={
+        "generation": catalog["generation"],
+        "stamp": _consolidated_stamp(),
+        "last": list(max(_period(key) for key in partitions)),
+    })
+    save_catalog(catalog)
+    return catalog
+
+
+def build_outputs(state):
+    """Regera as despesas agregadas a partir do estado, sem reler as partições."""
+    cadop_df = data_enrichment.load_cadop() if os.path.exists(data_enrichment.CADOP_CSV) else None
+    if cadop_df is None:
+        print("[AVISO] CADOP indisponível: despesas agregadas não atualizadas.")
+        return
+
+    operators = state.rename_axis("REG_ANS").reset_index()
+    operators["RazaoSocial"] = "Operadora ANS " + operators["REG_ANS"]
+
+    final_df = data_enrichment.enrich_with_cadop(operators, cadop_df)
+    final_df["Total_Despesas"] = final_df["total"]
+    final_df["Media_Trimestral"] = final_df["total"] / final_df["n"]
+    final_df["Desvio_Padrao"] = np.sqrt(final_df["m2"] / (final_df["n"] - 1)).where(final_df["n"] > 1)
+
+    data_enrichment.save_aggregated(final_df)
+
+
+def run_aggregation():
+    """Etapa de enriquecimento do modo incremental: agregadas a partir do estado salvo."""
+    print(">>> Agregação incremental <<<")
+    state = load_state(load_catalog())
+    if state is None:
+        print("[AVISO] Estado incremental inexistente: rode a consolidação incremental antes.")
+        return
+    build_outputs(state)
+
+
+def run(zip_paths=None, chunksize=data_processor.CSV_CHUNK_ROWS, aggregate=True):
+    """
+    Processa apenas os ZIPs novos ou alterados e atualiza as saídas.
+
+    Sem `zip_paths`, os arquivos vêm do manifesto de ingestão
+    (`changed_since`). Na primeira execução, sem estado salvo,
+    todos os ZIPs de data/raw são processados. Com `aggregate=False`,
+    as despesas agregadas ficam para `run_aggregation` (etapa seguinte
+    do pipeline).
+    """
+    print(">>> Iniciando consolidação incremental <<<")
+
+    manifest = Manifest()
+    catalog = load_catalog()
+    state = load_state(catalog)
+
+    if zip_paths is None:
+        if state is None:
+            zip_paths = sorted(glob.glob(os.path.join(data_processor.RAW_DIR, "*.zip")))
+        else:
+            zip_paths = [p for p in manifest.changed_since(MANIFEST_STAGE) if p.lower().endswith(".zip")]
+
+    if state is None:
+        state = pd.DataFrame(columns=STATE_COLUMNS, dtype=float).rename_axis("REG_ANS")
+
+    print(f"[INFO] {len(zip_paths)} arquivo(s) novo(s) ou alterado(s).")
+
+    previous_generation = catalog["generation"]
+    partitions = dict(catalog["partitions"])
+    changed = set()
+
+    new_df = process_archives(zip_paths, chunksize) if zip_paths else None
+    if new_df is not None:
+        for (ano, trimestre), period_df in new_df.groupby(["Ano", "Trimestre"]):
+            state = apply_partition(state, period_df.reset_index(drop=True), partitions, previous_generation + 1)
+            changed.add(_partition_key(ano, trimestre))
+
+    if changed:
+        catalog = commit(catalog, state, partitions)
+    update_consolidated(catalog, changed, previous_generation)
+    if aggregate:
+        build_outputs(state)
+    manifest.mark_consumed(MANIFEST_STAGE)
+
+    print(f"[SUCESSO] Arquivos gerados em {data_processor.PROCESSED_DIR}")
+    print(">>> Processo finalizado <<<")
+
+
+if __name__ == "__main__":
+    run()
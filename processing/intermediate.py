@@ -0,0 +1,92 @@
+"""
+Formato intermediário colunar (Parquet) para a passagem de dados entre etapas.
+
+Os CSVs continuam sendo gerados como entregáveis, mas as etapas seguintes
+leem preferencialmente o Parquet, que já vem tipado e dispensa a
+decodificação de texto e a conversão de vírgula decimal a cada leitura.
+
+O Parquet depende do `pyarrow`. Se ele não estiver instalado, ou se
+ANS_INTERMEDIATE_FORMAT=csv, as funções de escrita não fazem nada e as de
+leitura retornam None, e as etapas voltam a usar os CSVs.
+"""
+
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:
+    pyarrow = None
+
+PROCESSED_DIR = os.path.join("data", "processed")
+
+INTERMEDIATE_FORMAT = os.getenv("ANS_INTERMEDIATE_FORMAT", "parquet").lower()
+
+CONSOLIDADO_PARQUET = os.path.join(PROCESSED_DIR, "consolidado_despesas.parquet")
+AGREGADO_PARQUET = os.path.join(PROCESSED_DIR, "despesas_agregadas.parquet")
+
+CONSOLIDADO_SCHEMA = {
+    "REG_ANS": "int32",
+    "Ano": "int16",
+    "Trimestre": "int8",
+    "ValorDespesas": "float64",
+}
+
+AGREGADO_SCHEMA = {
+    "RegistroANS": "int32",
+    "CNPJ": "string",
+    "RazaoSocial": "string",
+    "Modalidade": "string",
+    "UF": "string",
+    "Total_Despesas": "float64",
+    "Media_Trimestral": "float64",
+    "Desvio_Padrao": "float64",
+}
+
+
+def enabled():
+    """Indica se o formato colunar está habilitado e disponível."""
+    return INTERMEDIATE_FORMAT == "parquet" and pyarrow is not None
+
+
+def write_table(df, path, schema):
+    """Grava apenas as colunas do schema, já convertidas para os tipos definidos."""
+    if not enabled():
+        return False
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df[list(schema)].astype(schema).to_parquet(path, index=False)
+    return True
+
+
+def read_table(path, schema, csv_path=None):
+    """
+    Lê o Parquet com o schema esperado.
+
+    Retorna None se o formato estiver desabilitado, se o arquivo não existir
+    ou se o CSV correspondente for mais recente (Parquet desatualizado).
+    """
+    if not enabled() or not os.path.exists(path):
+        return None
+
+    if csv_path and os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(path):
+        return None
+
+    return pd.read_parquet(path, columns=list(schema)).astype(schema)
+
+
+def write_consolidado(df):
+    return write_table(df, CONSOLIDADO_PARQUET, CONSOLIDADO_SCHEMA)
+
+
+def read_consolidado(csv_path=None):
+    return read_table(CONSOLIDADO_PARQUET, CONSOLIDADO_SCHEMA, csv_path)
+
+
+def write_agregado(df):
+    return write_table(df, AGREGADO_PARQUET, AGREGADO_SCHEMA)
+
+
+def read_agregado(csv_path=None):
+    return read_table(AGREGADO_PARQUET, AGREGADO_SCHEMA, csv_path)
@@ -0,0 +1,71 @@
+"""
+Versões vetorizadas das normalizações aplicadas linha a linha no pipeline.
+
+Cada função recebe e devolve uma `pd.Series`, produzindo o mesmo resultado
+das funções escalares equivalentes (`clean_currency`, `format_cnpj` etc.),
+mas usando os acessores `.str` do pandas em vez de `.apply` em Python.
+"""
+
+import pandas as pd
+
+NUMBER_PATTERN = r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?"
+
+
+def _as_str(values: pd.Series) -> pd.Series:
+    """Equivalente vetorizado de `str(x)`, inclusive para valores ausentes (NaN e None)."""
+    text = values.fillna("nan").astype(str)
+    if values.dtype == object:
+        # `fillna` também substitui None, mas `str(None)` é "None"
+        text = text.mask(values.to_numpy() == None, "None")  # noqa: E711
+    return text
+
+
+def parse_currency(values: pd.Series) -> pd.Series:
+    """
+    Converte valores no padrão brasileiro ("1.234,56") para float.
+    Valores ausentes ou inválidos viram 0.0, como em `clean_currency`.
+    """
+    text = _as_str(values).str.strip()
+    text = text.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+
+    # `astype(float)` é bem mais rápido que `pd.to_numeric(errors="coerce")`,
+    # então só os valores com formato numérico válido são convertidos.
+    valid = text.str.fullmatch(NUMBER_PATTERN).fillna(False).astype(bool)
+    result = pd.Series(0.0, index=values.index)
+    result[valid] = text[valid].astype(float)
+    return result
+
+
+def parse_decimal_comma(values: pd.Series) -> pd.Series:
+    """Converte valores com vírgula decimal e sem separador de milhar ("1234,56") para float."""
+    return _as_str(values).str.replace(",", ".", regex=False).astype(float)
+
+
+def cnpj_digits(values: pd.Series) -> pd.Series:
+    """Mantém apenas os dígitos do CNPJ."""
+    return _as_str(values).str.replace(r"\D", "", regex=True)
+
+
+def format_cnpj(values: pd.Series) -> pd.Series:
+    """
+    Formata CNPJs no padrão XX.XXX.XXX/0001-XX.
+    Valores que não possuem 14 dígitos são mantidos como estão.
+    """
+    original = _as_str(values)
+    digits = cnpj_digits(original)
+
+    formatted = (
+        digits.str[:2] + "." + digits.str[2:5] + "." + digits.str[5:8]
+        + "/" + digits.str[8:12] + "-" + digits.str[12:]
+    )
+    return formatted.where(digits.str.len() == 14, original)
+
+
+def is_valid_cnpj(values: pd.Series) -> pd.Series:
+    """Indica se o CNPJ possui 14 dígitos numéricos."""
+    return cnpj_digits(values).str.len() == 14
+
+
+def reg_ans_from_razao(values: pd.Series) -> pd.Series:
+    """Recupera o REG_ANS preservado no final da razão social provisória."""
+    return _as_str(values).str.replace(r"^.* ", "", regex=True)
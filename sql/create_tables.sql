@@ -1,18 +1,33 @@
+-- Busca por substring sem diferenciar acentos (índice de trigramas).
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- unaccent() não é IMMUTABLE e não pode ser usada em índices; este invólucro fixa o dicionário.
+CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$;
+
 CREATE TABLE operadoras (
     registro_ans INT PRIMARY KEY,
     cnpj VARCHAR(20),
     razao_social VARCHAR(255),
     modalidade VARCHAR(100),
-    uf CHAR(2)
+    uf CHAR(2),
+    cnpj_digitos VARCHAR(20) GENERATED ALWAYS AS (regexp_replace(cnpj, '\D', '', 'g')) STORED
 );
 
+CREATE INDEX ix_operadoras_razao_social_trgm ON operadoras USING gin (lower(f_unaccent(razao_social)) gin_trgm_ops);
+CREATE INDEX ix_operadoras_cnpj ON operadoras (cnpj);
+CREATE INDEX ix_operadoras_cnpj_digitos ON operadoras (cnpj_digitos text_pattern_ops);
+
 CREATE TABLE demonstracoes_contabeis (
     id SERIAL PRIMARY KEY,
     registro_ans INT,
     ano INT,
     trimestre INT,
     valor_despesa NUMERIC(18,2),
-    FOREIGN KEY (registro_ans) REFERENCES operadoras(registro_ans)
+    FOREIGN KEY (registro_ans) REFERENCES operadoras(registro_ans),
+    CONSTRAINT uq_demonstracoes_periodo UNIQUE (registro_ans, ano, trimestre)
 );
 
 CREATE TABLE despesas_agregadas (
@@ -23,4 +38,73 @@ CREATE TABLE despesas_agregadas (
     media_trimestral NUMERIC(18,2),
     desvio_padrao NUMERIC(18,2),
     FOREIGN KEY (registro_ans) REFERENCES operadoras(registro_ans)
-);
\ No newline at end of file
+);
+
+-- Versão dos dados: incrementada a cada carga, usada pela API para invalidar caches.
+CREATE TABLE versao_dados (
+    id INT PRIMARY KEY,
+    versao BIGINT NOT NULL DEFAULT 0,
+    atualizado_em TIMESTAMPTZ DEFAULT now()
+);
+-- Visões materializadas das queries analíticas (sql/analytical_queries.sql).
+-- São atualizadas pelo importador ao final de cada carga.
+
+-- Crescimento entre o primeiro e o último trimestre de cada operadora (com pelo menos dois trimestres).
+CREATE MATERIALIZED VIEW mv_crescimento_despesas AS
+WITH extremos AS (
+    SELECT DISTINCT ON (registro_ans)
+        registro_ans,
+        FIRST_VALUE(valor_despesa) OVER periodos AS valor_inicial,
+        LAST_VALUE(valor_despesa) OVER periodos AS valor_final,
+        COUNT(*) OVER periodos AS qtd_trimestres
+    FROM demonstracoes_contabeis
+    WINDOW periodos AS (
+        PARTITION BY registro_ans ORDER BY ano, trimestre
+        ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+    )
+)
+SELECT
+    e.registro_ans,
+    o.razao_social,
+    e.valor_inicial,
+    e.valor_final,
+    ROUND(((e.valor_final - e.valor_inicial) / e.valor_inicial) * 100, 2) AS crescimento_pct
+FROM extremos e
+JOIN operadoras o ON o.registro_ans = e.registro_ans
+WHERE e.qtd_trimestres > 1 AND e.valor_inicial > 0;
+
+CREATE UNIQUE INDEX ux_mv_crescimento_despesas ON mv_crescimento_despesas (registro_ans);
+CREATE INDEX ix_mv_crescimento_despesas_pct ON mv_crescimento_despesas (crescimento_pct DESC);
+
+-- Distribuição das despesas por UF.
+CREATE MATERIALIZED VIEW mv_despesas_uf AS
+SELECT
+    uf,
+    SUM(total_despesas) AS despesa_total_estado,
+    ROUND(AVG(total_despesas), 2) AS media_por_operadora,
+    COUNT(*) AS qtd_operadoras
+FROM despesas_agregadas
+WHERE uf IS NOT NULL
+GROUP BY uf;
+
+CREATE UNIQUE INDEX ux_mv_despesas_uf ON mv_despesas_uf (uf);
+
+-- Trimestres em que cada operadora ficou acima da média do mercado.
+CREATE MATERIALIZED VIEW mv_operadoras_acima_media AS
+WITH comparacao AS (
+    SELECT
+        registro_ans,
+        valor_despesa > AVG(valor_despesa) OVER (PARTITION BY ano, trimestre) AS acima_da_media
+    FROM demonstracoes_contabeis
+)
+SELECT
+    c.registro_ans,
+    o.razao_social,
+    COUNT(*) FILTER (WHERE c.acima_da_media) AS qtd_trimestres_acima,
+    COUNT(*) AS qtd_trimestres
+FROM comparacao c
+JOIN operadoras o ON o.registro_ans = c.registro_ans
+GROUP BY c.registro_ans, o.razao_social;
+
+CREATE UNIQUE INDEX ux_mv_operadoras_acima_media ON mv_operadoras_acima_media (registro_ans);
+CREATE INDEX ix_mv_operadoras_acima_media_qtd ON mv_operadoras_acima_media (qtd_trimestres_acima DESC, razao_social);
@@ -0,0 +1,12 @@
+-- Adiciona a chave natural (registro_ans, ano, trimestre) em bancos criados antes dela.
+-- Remove duplicatas geradas por recargas anteriores, mantendo o registro mais recente.
+
+DELETE FROM demonstracoes_contabeis d
+USING demonstracoes_contabeis mais_recente
+WHERE d.registro_ans = mais_recente.registro_ans
+  AND d.ano = mais_recente.ano
+  AND d.trimestre = mais_recente.trimestre
+  AND d.id < mais_recente.id;
+
+ALTER TABLE demonstracoes_contabeis
+    ADD CONSTRAINT uq_demonstracoes_periodo UNIQUE (registro_ans, ano, trimestre);
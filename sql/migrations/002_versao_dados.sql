@@ -0,0 +1,7 @@
+-- Tabela de versão dos dados, usada pela API para invalidar caches após cada carga.
+
+CREATE TABLE IF NOT EXISTS versao_dados (
+    id INT PRIMARY KEY,
+    versao BIGINT NOT NULL DEFAULT 0,
+    atualizado_em TIMESTAMPTZ DEFAULT now()
+);
@@ -0,0 +1,20 @@
+-- Índices de busca de operadoras para bancos criados antes desta versão.
+-- Requer as extensões pg_trgm e unaccent (pacote postgresql-contrib).
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$;
+
+ALTER TABLE operadoras
+    ADD COLUMN IF NOT EXISTS cnpj_digitos VARCHAR(20)
+    GENERATED ALWAYS AS (regexp_replace(cnpj, '\D', '', 'g')) STORED;
+
+CREATE INDEX IF NOT EXISTS ix_operadoras_razao_social_trgm
+    ON operadoras USING gin (lower(f_unaccent(razao_social)) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_operadoras_cnpj_digitos
+    ON operadoras (cnpj_digitos text_pattern_ops);
+
+ANALYZE operadoras;
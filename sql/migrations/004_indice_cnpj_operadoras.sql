@@ -0,0 +1,4 @@
+-- Índice para localizar a operadora pelo CNPJ (rotas /api/operadoras/{cnpj}).
+-- O histórico de despesas usa o índice da chave natural uq_demonstracoes_periodo.
+
+CREATE INDEX IF NOT EXISTS ix_operadoras_cnpj ON operadoras (cnpj);
@@ -0,0 +1,61 @@
+-- Visões materializadas das queries analíticas para bancos criados antes desta versão.
+
+-- Crescimento entre o primeiro e o último trimestre de cada operadora (com pelo menos dois trimestres).
+CREATE MATERIALIZED VIEW mv_crescimento_despesas AS
+WITH extremos AS (
+    SELECT DISTINCT ON (registro_ans)
+        registro_ans,
+        FIRST_VALUE(valor_despesa) OVER periodos AS valor_inicial,
+        LAST_VALUE(valor_despesa) OVER periodos AS valor_final,
+        COUNT(*) OVER periodos AS qtd_trimestres
+    FROM demonstracoes_contabeis
+    WINDOW periodos AS (
+        PARTITION BY registro_ans ORDER BY ano, trimestre
+        ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+    )
+)
+SELECT
+    e.registro_ans,
+    o.razao_social,
+    e.valor_inicial,
+    e.valor_final,
+    ROUND(((e.valor_final - e.valor_inicial) / e.valor_inicial) * 100, 2) AS crescimento_pct
+FROM extremos e
+JOIN operadoras o ON o.registro_ans = e.registro_ans
+WHERE e.qtd_trimestres > 1 AND e.valor_inicial > 0;
+
+CREATE UNIQUE INDEX ux_mv_crescimento_despesas ON mv_crescimento_despesas (registro_ans);
+CREATE INDEX ix_mv_crescimento_despesas_pct ON mv_crescimento_despesas (crescimento_pct DESC);
+
+-- Distribuição das despesas por UF.
+CREATE MATERIALIZED VIEW mv_despesas_uf AS
+SELECT
+    uf,
+    SUM(total_despesas) AS despesa_total_estado,
+    ROUND(AVG(total_despesas), 2) AS media_por_operadora,
+    COUNT(*) AS qtd_operadoras
+FROM despesas_agregadas
+WHERE uf IS NOT NULL
+GROUP BY uf;
+
+CREATE UNIQUE INDEX ux_mv_despesas_uf ON mv_despesas_uf (uf);
+
+-- Trimestres em que cada operadora ficou acima da média do mercado.
+CREATE MATERIALIZED VIEW mv_operadoras_acima_media AS
+WITH comparacao AS (
+    SELECT
+        registro_ans,
+        valor_despesa > AVG(valor_despesa) OVER (PARTITION BY ano, trimestre) AS acima_da_media
+    FROM demonstracoes_contabeis
+)
+SELECT
+    c.registro_ans,
+    o.razao_social,
+    COUNT(*) FILTER (WHERE c.acima_da_media) AS qtd_trimestres_acima,
+    COUNT(*) AS qtd_trimestres
+FROM comparacao c
+JOIN operadoras o ON o.registro_ans = c.registro_ans
+GROUP BY c.registro_ans, o.razao_social;
+
+CREATE UNIQUE INDEX ux_mv_operadoras_acima_media ON mv_operadoras_acima_media (registro_ans);
+CREATE INDEX ix_mv_operadoras_acima_media_qtd ON mv_operadoras_acima_media (qtd_trimestres_acima DESC, razao_social);
@@ -0,0 +1,81 @@
+import os
+import zipfile
+
+import pytest
+
+from processing import data_enrichment, data_processor, incremental
+
+HEADER = '"DATA";"REG_ANS";"CD_CONTA_CONTABIL";"DESCRICAO";"VL_SALDO_INICIAL";"VL_SALDO_FINAL"'
+EXPENSES = "Despesas com Eventos / Sinistros"
+
+
+def write_zip(name, rows):
+    """ZIP trimestral no layout da ANS: (REG_ANS, valor) de despesas com eventos/sinistros."""
+    lines = [HEADER] + [
+        f'"2025-01-01";"{reg_ans}";"411";"{EXPENSES}";"0,00";"{valor}"' for reg_ans, valor in rows
+    ]
+    lines.append('"2025-01-01";"300001";"311";"CONTRAPRESTAÇÕES EFETIVAS";"0,00";"999,99"')
+
+    path = os.path.join(data_processor.RAW_DIR, name)
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr(name.replace(".zip", ".csv"), "\n".join(lines).encode("latin1"))
+    return path
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(data_processor.RAW_DIR)
+    with open(data_enrichment.CADOP_CSV, "w", encoding="latin1") as f:
+        f.write('"REGISTRO_OPERADORA";"CNPJ";"Razao_Social";"Modalidade";"UF"\n')
+        for reg_ans in (300001, 300002, 300003):
+            f.write(f'"{reg_ans}";"1122233300{reg_ans % 100:04d}";"OPERADORA {reg_ans} LTDA";"Medicina de Grupo";"SP"\n')
+    return tmp_path
+
+
+def outputs():
+    with open(data_processor.FINAL_CSV, "rb") as f:
+        consolidado = f.read()
+    with open(data_enrichment.OUTPUT_CSV, "rb") as f:
+        agregado = f.read()
+    return consolidado, agregado
+
+
+def full_run():
+    data_processor.run()
+    data_enrichment.run()
+    return outputs()
+
+
+def archives():
+    # Dois arquivos com o mesmo trimestre (1T2025) e um trimestre seguinte
+    return [
+        write_zip("1T2025.zip", [(300001, "1.000,10"), (300002, "250,00")]),
+        write_zip("1T2025_complemento.zip", [(300001, "500,05"), (300003, "75,50")]),
+        write_zip("2T2025.zip", [(300001, "1.200,00"), (300002, "300,25"), (300003, "80,00")]),
+    ]
+
+
+def test_same_quarter_in_two_archives_matches_full_run(workdir):
+    paths = archives()
+    expected = full_run()
+
+    incremental.run(zip_paths=paths)
+
+    assert outputs() == expected
+    assert sorted(incremental.load_catalog()["partitions"]) == ["2025T1", "2025T2"]
+
+
+def test_republished_quarter_split_across_archives_is_replaced_once(workdir):
+    first = write_zip("1T2025.zip", [(300001, "10,00"), (300002, "20,00")])
+    incremental.run(zip_paths=[first])
+
+    paths = archives()
+    expected = full_run()
+
+    incremental.run(zip_paths=paths)
+
+    assert outputs() == expected
+    state = incremental.load_state(incremental.load_catalog())
+    assert state.loc["300001", "n"] == 2
+    assert state.loc["300001", "total"] == pytest.approx(1000.10 + 500.05 + 1200.00)
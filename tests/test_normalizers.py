@@ -0,0 +1,73 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from processing import csv_reader, normalizers
+from processing.data_enrichment import format_cnpj
+from processing.data_processor import clean_currency
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+DEMONSTRACOES = os.path.join(FIXTURES, "ans_demonstracoes_1T2025.csv")
+CADOP = os.path.join(FIXTURES, "ans_cadop.csv")
+
+
+@pytest.fixture(params=["pyarrow", "c"])
+def read_csv(request, monkeypatch):
+    """`csv_reader.read_csv` com cada um dos parsers, como o pipeline lê os arquivos."""
+    if request.param == "pyarrow" and csv_reader.pa_csv is None:
+        pytest.skip("pyarrow não instalado")
+    monkeypatch.setattr(csv_reader, "CSV_ENGINE", request.param)
+    return csv_reader.read_csv
+
+
+def assert_same(result, expected):
+    """Mesmos valores e mesmas posições de NaN."""
+    pd.testing.assert_series_equal(
+        result.reset_index(drop=True).astype(expected.dtype),
+        expected.reset_index(drop=True),
+        check_names=False,
+    )
+
+
+@pytest.mark.parametrize("column", ["VL_SALDO_INICIAL", "VL_SALDO_FINAL"])
+def test_parse_currency_matches_clean_currency(read_csv, column):
+    values = read_csv(DEMONSTRACOES)[column]
+    assert values.isna().any()
+
+    result = normalizers.parse_currency(values)
+
+    assert_same(result, values.apply(clean_currency))
+    assert (result < 0).any()
+
+
+def test_parse_currency_with_none_and_nan():
+    values = pd.Series(["1.234,56", None, np.nan, "", "-0,01", "12,3,4", "abc"], dtype=object)
+    assert_same(normalizers.parse_currency(values), values.apply(clean_currency))
+
+
+def test_format_cnpj_matches_scalar(read_csv):
+    cnpjs = read_csv(CADOP)["CNPJ"]
+    assert cnpjs.isna().any()
+
+    assert_same(normalizers.format_cnpj(cnpjs), cnpjs.apply(format_cnpj))
+    assert_same(normalizers.is_valid_cnpj(cnpjs), cnpjs.apply(lambda x: len(re.sub(r"\D", "", str(x))) == 14))
+
+
+def test_format_cnpj_with_none_and_short_values():
+    cnpjs = pd.Series(["81741608401511", "1234567000190", "123", None, np.nan, "11.222.333/0001-81"], dtype=object)
+    assert_same(normalizers.format_cnpj(cnpjs), cnpjs.apply(format_cnpj))
+
+
+def test_parse_decimal_comma_matches_scalar():
+    values = pd.Series(["24359529,90", "-98765,40", "0,00", "1528743,07"])
+    assert_same(normalizers.parse_decimal_comma(values), values.apply(lambda x: float(str(x).replace(",", "."))))
+
+
+def test_reg_ans_from_razao_matches_split(read_csv):
+    razao = "Operadora Histórica " + read_csv(DEMONSTRACOES)["REG_ANS"]
+    razao = pd.concat([razao, pd.Series([None, np.nan, "SEM ESPACO"], dtype=object)], ignore_index=True)
+
+    assert_same(normalizers.reg_ans_from_razao(razao), razao.apply(lambda x: str(x).split(" ")[-1]))